@@ -0,0 +1,358 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import CACHE_DIR, load_arrays, save_arrays
+from enums import ExistentFieldPlayerColumn, Position
+from similarity import BLOCK_SIZE
+from trajectory import player_identities
+
+ARCHETYPES_PATH = os.path.join(CACHE_DIR, "archetypes.npz")
+ARCHETYPES_PER_POSITION = 5
+# Centroids are fitted on, and peers picked among, regular players only; everyone is assigned
+ARCHETYPE_MIN_MINUTES = 600
+BATCH_SIZE = 256
+EPOCHS = 10
+PEERS_PER_PLAYER = 10
+# Keepers are described by their own metrics, the outfield per-90 features say little about them
+CLUSTERED_POSITIONS = [position for position in Position if position is not Position.GOALKEEPER]
+TRAITS_PER_ARCHETYPE = 3
+
+# Descriptive per-player arrays kept in the lookup, so peers from any season show without loading it
+RECORD_COLUMNS = {"players": "Player", "teams": "Team", "positions": "Primary position"}
+
+
+def season_id(key: tuple) -> str:
+    # Processed dataset key as stored in the lookup; a new workbook version is a new season
+    return repr(key)
+
+
+def squared_distances(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (vectors ** 2).sum(axis=1)[:, None] - 2 * vectors @ centroids.T + (centroids ** 2).sum(axis=1)[None, :]
+    return np.maximum(distances, 0)
+
+
+def kmeans_plus_plus(vectors: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = [vectors[rng.integers(len(vectors))]]
+    closest = squared_distances(vectors, centroids[0][None])[:, 0]
+    for _ in range(1, k):
+        total = closest.sum()
+        choice = rng.choice(len(vectors), p=closest / total) if total > 0 else rng.integers(len(vectors))
+        centroids.append(vectors[choice])
+        closest = np.minimum(closest, squared_distances(vectors, vectors[choice][None])[:, 0])
+    return np.array(centroids)
+
+
+def minibatch_kmeans(vectors: np.ndarray, centroids: np.ndarray, counts: np.ndarray, rng: np.random.Generator,
+                     batch_size: int = BATCH_SIZE, epochs: int = EPOCHS):
+    # Mini-batch k-means: each centroid moves towards its batch members with a 1 / count learning
+    # rate. Counts carry over between runs, so a warm start on a new season nudges the centroids
+    # instead of letting the new players outweigh every season clustered before.
+    centroids, counts = centroids.copy(), counts.copy()
+    if not len(vectors):
+        return centroids, counts
+    for _ in range(epochs * int(np.ceil(len(vectors) / batch_size))):
+        batch = vectors[rng.choice(len(vectors), size=min(batch_size, len(vectors)), replace=False)]
+        labels = np.argmin(squared_distances(batch, centroids), axis=1)
+        sizes = np.bincount(labels, minlength=len(centroids))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, batch)
+        hit = sizes > 0
+        counts[hit] += sizes[hit]
+        centroids[hit] += (sums[hit] - sizes[hit, None] * centroids[hit]) / counts[hit, None]
+    return centroids, counts
+
+
+def archetype_names(centroids: np.ndarray, features: list[str]) -> list[str]:
+    # The standardized features a centroid is furthest above its position average on
+    names = []
+    for centroid in centroids:
+        traits = np.argsort(-centroid, kind="stable")[:TRAITS_PER_ARCHETYPE]
+        names.append(", ".join(features[i].replace(" per 90", "") for i in traits))
+    return names
+
+
+def _season_records(dataset, features: list[str]) -> dict:
+    players_df = dataset.players_df
+    available = [feature for feature in features if feature in dataset.numeric_columns]
+    values = np.full((len(dataset), len(features)), np.nan)
+    if available:
+        values[:, [features.index(feature) for feature in available]] = dataset.values(available)
+
+    records = {
+        "values": values,
+        "rows": np.arange(len(dataset), dtype=np.int32),
+        "groups": dataset.position_groups.astype(np.int16),
+        "minutes": dataset.array(ExistentFieldPlayerColumn.MINUTES_PLAYED.value).astype(np.float32),
+        "identities": player_identities(players_df),
+        "leagues": np.full(len(dataset), dataset.league, dtype=object),
+        "years": np.full(len(dataset), dataset.year, dtype=object),
+    }
+    for name, column in RECORD_COLUMNS.items():
+        records[name] = players_df[column].astype(object).where(players_df[column].notna(), "").to_numpy(dtype=object)
+    return records
+
+
+def update_archetypes(pipeline, path: str = ARCHETYPES_PATH, refit: bool = False, k: int = ARCHETYPES_PER_POSITION,
+                      min_minutes: float = ARCHETYPE_MIN_MINUTES, seed: int = 0) -> dict:
+    # Clusters the registered league-seasons not clustered yet, starting from the stored centroids
+    # and standardization, then reassigns every player and stores assignments, distances and peers.
+    # Seasons already in the lookup are not reprocessed: their standardized vectors are stored too.
+    previous = None if refit else load_arrays(path)
+    rng = np.random.default_rng(seed)
+
+    registered = {}
+    for league, year in pipeline.dataset_loader.get_registered_datasets():
+        try:
+            registered[season_id(pipeline.dataset_key(league, year))] = (league, year)
+        except (OSError, ValueError):
+            continue  # workbook missing on disk, nothing to cluster
+
+    known = list(previous["season_ids"]) if previous is not None else []
+    new_ids = []
+    datasets = []
+    skipped = []
+    for sid in registered:
+        if sid in known:
+            continue
+        dataset = pipeline.get(*registered[sid])
+        if not dataset.complete:
+            # A truncated workbook is clustered once it reads completely
+            skipped.append(registered[sid])
+            continue
+        new_ids.append(sid)
+        datasets.append(dataset)
+
+    if previous is not None:
+        features = [str(feature) for feature in previous["features"]]
+    else:
+        features = [
+            feature for feature in ExistentFieldPlayerColumn.values_for_similarity()
+            if datasets and all(feature in dataset.numeric_columns for dataset in datasets)
+        ]
+
+    # Previous players of seasons still registered, then the new ones
+    kept_ids = [sid for sid in known if sid in registered]
+    season_ids = kept_ids + new_ids
+    parts = []
+    if previous is not None:
+        keep = np.isin(previous["season_index"], [known.index(sid) for sid in kept_ids])
+        remap = np.full(len(known), -1, dtype=np.int32)
+        remap[[known.index(sid) for sid in kept_ids]] = np.arange(len(kept_ids))
+        old = {name: previous[name][keep] for name in ("vectors", "rows", "groups", "minutes", "identities", "leagues", "years",
+                                                       *RECORD_COLUMNS)}
+        old["season_index"] = remap[previous["season_index"][keep]]
+        parts.append(old)
+    for offset, dataset in enumerate(datasets):
+        records = _season_records(dataset, features)
+        records["season_index"] = np.full(len(dataset), len(kept_ids) + offset, dtype=np.int32)
+        parts.append(records)
+
+    lookup = {}
+    if parts:
+        for name in ("season_index", "rows", "groups", "minutes", "identities", "leagues", "years", *RECORD_COLUMNS):
+            lookup[name] = np.concatenate([part[name] for part in parts])
+    else:
+        lookup = {name: np.empty(0) for name in ("season_index", "rows", "groups", "minutes")}
+    total = len(lookup["rows"])
+    is_new = np.zeros(total, dtype=bool)
+    new_values = np.vstack([part["values"] for part in parts if "values" in part]) if datasets else np.empty((0, len(features)))
+    is_new[total - len(new_values):] = True
+
+    vectors = np.zeros((total, len(features)), dtype=np.float32)
+    if previous is not None:
+        vectors[:total - len(new_values)] = parts[0]["vectors"]
+    labels = np.full(total, -1, dtype=np.int16)
+    distances = np.full((total, k), np.nan, dtype=np.float32)
+    model = {}
+    summary = {"new_seasons": [registered[sid] for sid in new_ids], "skipped_seasons": skipped, "positions": {}}
+
+    members = list(Position)
+    for position in CLUSTERED_POSITIONS:
+        group = members.index(position)
+        in_group = lookup["groups"] == group if total else np.zeros(0, dtype=bool)
+        new_in_group = in_group[is_new]
+        stored = previous is not None and f"{position.name}_centroids" in previous
+
+        if stored:
+            mean, std = previous[f"{position.name}_mean"], previous[f"{position.name}_std"]
+        else:
+            # Per position group, so archetypes separate players of one position rather than positions
+            sample = new_values[new_in_group & (lookup["minutes"][is_new] >= min_minutes)]
+            if not len(sample):
+                continue
+            mean = np.nan_to_num(np.nanmean(sample, axis=0))
+            std = np.nanstd(sample, axis=0)
+            std = np.where((std == 0) | np.isnan(std), 1.0, std)
+        # Missing values land on the position average
+        vectors[np.flatnonzero(is_new)[new_in_group]] = np.nan_to_num((new_values[new_in_group] - mean) / std)
+
+        training = in_group & is_new & (lookup["minutes"] >= min_minutes)
+        if stored:
+            centroids, counts = previous[f"{position.name}_centroids"], previous[f"{position.name}_counts"]
+        else:
+            centroids = kmeans_plus_plus(vectors[training], min(k, int(training.sum())), rng)
+            counts = np.zeros(len(centroids))
+        centroids, counts = minibatch_kmeans(vectors[training], centroids, counts, rng)
+
+        # Every player of the group, old seasons included, goes to its nearest centroid
+        group_rows = np.flatnonzero(in_group)
+        group_distances = np.sqrt(squared_distances(vectors[group_rows], centroids))
+        labels[group_rows] = np.argmin(group_distances, axis=1)
+        distances[group_rows, :len(centroids)] = group_distances
+
+        names = archetype_names(centroids, features)
+        model.update({
+            f"{position.name}_mean": mean,
+            f"{position.name}_std": std,
+            f"{position.name}_centroids": centroids,
+            f"{position.name}_counts": counts,
+            f"{position.name}_names": np.array(names, dtype=str),
+        })
+        summary["positions"][position] = {
+            "players": len(group_rows),
+            "trained": int(training.sum()),
+            "archetypes": [(name, int((labels[group_rows] == label).sum())) for label, name in enumerate(names)],
+        }
+
+    peer_ids, peer_distances = _archetype_peers(vectors, lookup, labels, min_minutes)
+
+    arrays = dict(lookup)
+    for name in ("identities", "leagues", "years", *RECORD_COLUMNS):
+        arrays[name] = np.asarray(arrays.get(name, []), dtype=str)
+    arrays.update(model)
+    arrays.update({
+        "features": np.array(features, dtype=str),
+        "season_ids": np.array(season_ids, dtype=str),
+        "season_index": np.asarray(lookup["season_index"], dtype=np.int32),
+        "rows": np.asarray(lookup["rows"], dtype=np.int32),
+        "groups": np.asarray(lookup["groups"], dtype=np.int16),
+        "minutes": np.asarray(lookup["minutes"], dtype=np.float32),
+        "vectors": vectors,
+        "labels": labels,
+        "distances": distances,
+        "peer_ids": peer_ids,
+        "peer_distances": peer_distances,
+    })
+    save_arrays(path, **arrays)
+    summary["players"] = total
+    return summary
+
+
+def _archetype_peers(vectors: np.ndarray, lookup: dict, labels: np.ndarray, min_minutes: float):
+    # Nearest regular players of the same position group and archetype, other seasons of the
+    # player excluded; blocked so a large archetype never builds its full distance matrix
+    total = len(vectors)
+    ids = np.full((total, PEERS_PER_PLAYER), -1, dtype=np.int32)
+    peer_distances = np.full((total, PEERS_PER_PLAYER), np.nan, dtype=np.float32)
+    if not total:
+        return ids, peer_distances
+
+    eligible = lookup["minutes"] >= min_minutes
+    identities = lookup["identities"]
+    clusters = np.unique(np.stack([lookup["groups"], labels], axis=1)[labels >= 0], axis=0)
+    for group, label in clusters:
+        cluster = np.flatnonzero((lookup["groups"] == group) & (labels == label))
+        candidates = cluster[eligible[cluster]]
+        if not len(candidates):
+            continue
+        k = min(PEERS_PER_PLAYER, len(candidates))
+        for start in range(0, len(cluster), BLOCK_SIZE):
+            block = cluster[start:start + BLOCK_SIZE]
+            block_distances = np.sqrt(squared_distances(vectors[block], vectors[candidates]))
+            block_distances[identities[block][:, None] == identities[candidates][None, :]] = np.inf
+
+            top = np.argsort(block_distances, axis=1, kind="stable")[:, :k]
+            top_distances = np.take_along_axis(block_distances, top, axis=1)
+            valid = np.isfinite(top_distances)
+            ids[block, :k] = np.where(valid, candidates[top], -1)
+            peer_distances[block, :k] = np.where(valid, top_distances, np.nan)
+    return ids, peer_distances
+
+
+class ArchetypeLookup:
+    # Read side of the archetype job: the stored assignments and peers of every clustered player,
+    # looked up by processed dataset key and row. Nothing is computed at request time.
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+        self.season_ids = {str(sid): i for i, sid in enumerate(arrays["season_ids"])}
+        self._members = {
+            (int(season), int(row)): i for i, (season, row) in enumerate(zip(arrays["season_index"], arrays["rows"]))
+        }
+
+    @classmethod
+    def load(cls, path: str = ARCHETYPES_PATH):
+        # None until the job has run
+        arrays = load_arrays(path)
+        return cls(arrays) if arrays is not None else None
+
+    def __len__(self):
+        return len(self.arrays["rows"])
+
+    def member(self, dataset, row: int):
+        # Position in the lookup, None when the season (or this version of it) was not clustered yet
+        season = self.season_ids.get(season_id(dataset.key))
+        return None if season is None else self._members.get((season, int(row)))
+
+    def archetype(self, member: int):
+        group, label = int(self.arrays["groups"][member]), int(self.arrays["labels"][member])
+        if label < 0:
+            return None
+        position = list(Position)[group]
+        return {
+            "position": position,
+            "label": label,
+            "name": str(self.arrays[f"{position.name}_names"][label]),
+            "distance": float(self.arrays["distances"][member, label]),
+        }
+
+    def peers(self, member: int, k: int = PEERS_PER_PLAYER) -> pd.DataFrame:
+        ids = self.arrays["peer_ids"][member][:k]
+        valid = ids >= 0
+        ids = ids[valid]
+        return pd.DataFrame({
+            "Player": self.arrays["players"][ids],
+            "Team": self.arrays["teams"][ids],
+            "League": self.arrays["leagues"][ids],
+            "Year": self.arrays["years"][ids],
+            "Primary position": self.arrays["positions"][ids],
+            "Minutes played": self.arrays["minutes"][ids],
+            "Distance": self.arrays["peer_distances"][member][:k][valid],
+        })
+
+
+def main(argv=None):
+    from data_loader import DatasetLoader, read_datasets_registry, read_player_data
+    from pipeline import ProcessingPipeline
+
+    parser = argparse.ArgumentParser(description="Cluster players into playing-style archetypes per position group.")
+    parser.add_argument("--registry", default="datasets.xlsx")
+    parser.add_argument("--output", default=ARCHETYPES_PATH)
+    parser.add_argument("--archetypes", type=int, default=ARCHETYPES_PER_POSITION, help="Archetypes per position group")
+    parser.add_argument("--min-minutes", type=float, default=ARCHETYPE_MIN_MINUTES)
+    parser.add_argument("--refit", action="store_true", help="Ignore stored centroids and cluster every season again")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Same processing as the app (every player, compact tables), so dataset keys and rows match
+    pipeline = ProcessingPipeline(DatasetLoader(read_datasets_registry(args.registry)), compact=True,
+                                  read_players=read_player_data, min_minutes=0)
+    start = time.perf_counter()
+    summary = update_archetypes(pipeline, args.output, args.refit, args.archetypes, args.min_minutes, args.seed)
+
+    seasons = ", ".join(f"{league} {year}" for league, year in summary["new_seasons"]) or "none"
+    print(f"New seasons clustered: {seasons}")
+    for league, year in summary["skipped_seasons"]:
+        print(f"Skipped {league} {year}: the workbook looks truncated")
+    for position, info in summary["positions"].items():
+        print(f"{position}: {info['players']} players, {info['trained']} fitted on")
+        for label, (name, size) in enumerate(info["archetypes"]):
+            print(f"  {label + 1}. {name} ({size})")
+    print(f"Wrote {summary['players']} players to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+
+from enums import Stats
+
+FORMATS = ("png", "svg", "pdf")
+CHUNK_SIZE = 25
+
+
+def slugify(value: str) -> str:
+    return re.sub(r"[^\w\-]+", "_", value, flags=re.UNICODE).strip("_")
+
+
+def _init_worker():
+    # Headless rendering, no display or Streamlit runtime needed
+    matplotlib.use("Agg")
+
+
+def _render_chunk(job):
+    from chart_plotter import RadarTemplate
+
+    categories, charts, output_dir, formats, dpi = job
+    template = RadarTemplate(categories)
+    written = []
+    try:
+        for file_stem, title, normalized, real in charts:
+            template.draw([normalized], [real], [title], title=title)
+            for file_format in formats:
+                path = os.path.join(output_dir, f"{file_stem}.{file_format}")
+                template.save(path, format=file_format, dpi=dpi)
+                written.append(path)
+    finally:
+        template.close()
+    return written
+
+
+def build_charts(pipeline, league: str, year: str, role: Stats, baseline: str = "position", all_positions: bool = False):
+    from pipeline import Population
+
+    dataset = pipeline.get(league, year)
+    if role is Stats.GOALKEEPER:
+        # Keeper metrics only exist on the keeper dataset, normalized against keepers only
+        dataset = pipeline.goalkeepers(dataset)
+    missing = [stat for stat in role.value if stat not in dataset.numeric_columns]
+    if missing:
+        raise ValueError(f"Role '{role.name}' stats missing from {league} {year}: {', '.join(missing)}")
+    categories = list(role.value)
+
+    position_codes = [code for position in role.positions for code in position.value]
+    position_filter = [("Primary position", position_codes)]
+
+    if all_positions:
+        rows = np.arange(len(dataset))
+    else:
+        rows = np.flatnonzero(dataset.mask("Primary position", position_codes))
+    players_df = dataset.players_df.iloc[rows]
+
+    population = Population([dataset], position_filter if baseline == "position" else ())
+    normalized = population.normalization_index.normalize_players(players_df, categories)
+    real = players_df[categories].to_numpy(dtype=float)
+
+    charts = []
+    for row, normalized_row, real_row in zip(rows, normalized.to_numpy(), real):
+        label = dataset.player_index.label_for_row(row)
+        file_stem = f"{slugify(label)}_{slugify(league)}_{slugify(year)}_{role.name.lower()}"
+        charts.append((file_stem, f"{label} ({year})", normalized_row.tolist(), real_row.tolist()))
+    return categories, charts
+
+
+def generate_reports(pipeline, league: str, year: str, role: Stats, output_dir: str, formats=("png",),
+                     workers: int = None, baseline: str = "position", all_positions: bool = False, dpi: int = 100):
+    categories, charts = build_charts(pipeline, league, year, role, baseline, all_positions)
+    os.makedirs(output_dir, exist_ok=True)
+
+    jobs = [
+        (categories, charts[start:start + CHUNK_SIZE], output_dir, tuple(formats), dpi)
+        for start in range(0, len(charts), CHUNK_SIZE)
+    ]
+
+    written = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        for paths in executor.map(_render_chunk, jobs):
+            written.extend(paths)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render radar charts for every qualifying player of a league-season.")
+    parser.add_argument("--league", required=True, help="League as listed in datasets.xlsx, e.g. ROMANIA")
+    parser.add_argument("--year", required=True, help="Season as listed in datasets.xlsx, e.g. 24-25")
+    parser.add_argument("--role", required=True, choices=[role.name for role in Stats], type=str.upper)
+    parser.add_argument("--output", default="reports", help="Output directory")
+    parser.add_argument("--format", nargs="+", default=["png"], choices=FORMATS, dest="formats")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--baseline", choices=["position", "league"], default="position",
+                        help="Normalize against the role's position group or the whole league-season")
+    parser.add_argument("--all-positions", action="store_true", help="Render every player, not only the role's positions")
+    parser.add_argument("--dpi", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    matplotlib.use("Agg")
+    from data_loader import DatasetLoader, read_datasets_registry, read_player_data
+    from pipeline import ProcessingPipeline
+
+    # Read without the Streamlit caches, there is no script run context here
+    pipeline = ProcessingPipeline(DatasetLoader(read_datasets_registry()), read_players=read_player_data)
+    start = time.perf_counter()
+    try:
+        written = generate_reports(
+            pipeline, args.league, args.year, Stats[args.role], args.output, args.formats,
+            args.workers, args.baseline, args.all_positions, args.dpi,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(f"Wrote {len(written)} files to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKSPACE_DIR = os.path.join(REPO_DIR, ".benchmark_workspace")
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmark_results")
+REGRESSION_THRESHOLD = 1.2
+SYNTHETIC_LEAGUE = "SYNTHETIC"
+
+
+# === Workspaces ===
+
+def _jitter(df: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    # Multiplicative noise on float stats keeps distributions realistic without exact duplicates
+    floats = df.select_dtypes(include="float").columns
+    noise = rng.normal(1.0, 0.05, size=(len(df), len(floats)))
+    return df.assign(**{col: (df[col].to_numpy() * noise[:, i]).round(2) for i, col in enumerate(floats)})
+
+
+def _scale_workbook(df: pd.DataFrame, scale: int, rng: np.random.Generator) -> pd.DataFrame:
+    if scale == 1:
+        return df
+    copies = [df]
+    for copy in range(1, scale):
+        scaled = _jitter(df, rng)
+        for column in ("Player", "Full name"):
+            scaled[column] = scaled[column].astype(str) + f" #{copy}"
+        copies.append(scaled)
+    return pd.concat(copies, ignore_index=True)
+
+
+def prepare_workspace(scale: int = 1, seasons: int = 0, seed: int = 0) -> str:
+    # A directory laid out like the repo (datasets.xlsx + datasets/), scaled up and reused across runs
+    path = os.path.join(WORKSPACE_DIR, f"scale-{scale}-seasons-{seasons}")
+    registry_path = os.path.join(path, "datasets.xlsx")
+    if os.path.exists(registry_path):
+        return path
+
+    from dataset_cache import read_workbook
+
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(path, "datasets"), exist_ok=True)
+    registry = pd.read_excel(os.path.join(REPO_DIR, "datasets.xlsx"))
+    registry.columns = registry.columns.str.strip().str.upper()
+
+    entries = []
+    for league, year, workbook in zip(registry["LEAGUE"], registry["YEAR"], registry["PATH"]):
+        source = os.path.join(REPO_DIR, "datasets", workbook)
+        if scale == 1:
+            shutil.copy2(source, os.path.join(path, "datasets", workbook))
+        else:
+            _scale_workbook(read_workbook(source), scale, rng).to_excel(os.path.join(path, "datasets", workbook), index=False)
+        entries.append((league, workbook, year))
+
+    # Extra synthetic seasons derived from the first bundled workbook
+    if seasons:
+        base = read_workbook(os.path.join(REPO_DIR, "datasets", registry["PATH"].iloc[0]))
+        for season in range(seasons):
+            year = f"{(season % 90) + 10:02d}-{(season % 90) + 11:02d}"
+            workbook = f"synthetic-{season:03d}.xlsx"
+            _scale_workbook(_jitter(base, rng), scale, rng).to_excel(os.path.join(path, "datasets", workbook), index=False)
+            entries.append((f"{SYNTHETIC_LEAGUE} {season // 90}" if season >= 90 else SYNTHETIC_LEAGUE, workbook, year))
+
+    pd.DataFrame(entries, columns=["LEAGUE", "PATH", "YEAR"]).to_excel(registry_path, index=False)
+    return path
+
+
+def use_own_cache() -> str:
+    # The suite clears its cache between runs, so it gets a temporary directory of its own. It has
+    # to be set before dataset_cache is imported, a directory DATASET_CACHE_DIR points at is never used.
+    if "dataset_cache" in sys.modules:
+        raise RuntimeError("The benchmark cache directory must be set before dataset_cache is imported")
+    cache_dir = tempfile.mkdtemp(prefix="benchmark-cache-")
+    os.environ["DATASET_CACHE_DIR"] = cache_dir
+    return cache_dir
+
+
+@contextlib.contextmanager
+def inside(path: str):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+# === Measurement ===
+
+def measure(name: str, fn, repeat: int, setup=None, **context) -> dict:
+    # Wall time over `repeat` runs, then one traced run for peak memory and retained allocations
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    gc.collect()
+
+    result = {
+        "name": name,
+        "repeat": repeat,
+        "wall_s": {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.fmean(timings),
+            "max": max(timings),
+        },
+        "peak_bytes": peak,
+        "net_bytes": current,
+        "retained_blocks": sys.getallocatedblocks() - blocks_before,
+    }
+    result.update(context)
+    print(f"  {name:<40} median {result['wall_s']['median'] * 1000:9.2f} ms   peak {peak / 1024 ** 2:8.2f} MB")
+    return result
+
+
+def run_suite(workspace: str, repeat: int, cache_dir: str, only=None) -> list:
+    import dataset_cache
+    from chart_plotter import RENDER_CACHE, SVG, RadarChartPlotter, RenderCache
+    from data_loader import DatasetLoader, load_datasets_excel, load_player_data, read_player_data
+    from dataset_cache import read_workbook
+    from enums import Stats
+    from normalization import NormalizationIndex
+    from stats_processor import StatsProcessor
+    from streamlit import config
+    from streamlit.logger import set_log_level
+
+    # Bare-mode Streamlit calls warn about the missing script context on every call.
+    # The config is parsed first, otherwise parsing it later resets the log level.
+    config.get_option("logger.level")
+    set_log_level("error")
+    results = []
+
+    def wanted(name):
+        return not only or any(pattern in name for pattern in only)
+
+    def clear_cache():
+        if os.path.abspath(dataset_cache.CACHE_DIR) != os.path.abspath(cache_dir):
+            raise RuntimeError(f"Refusing to clear {dataset_cache.CACHE_DIR}, it is not the benchmark's cache directory")
+        dataset_cache.clear_cache()
+
+    with inside(workspace):
+        registry = load_datasets_excel()
+        league, year = registry["LEAGUE"].iloc[0], registry["YEAR"].iloc[0]
+        path = DatasetLoader().get_dataset_path(league, year)
+        raw_df = read_workbook(path)
+        context = {"rows": len(raw_df), "datasets": len(registry)}
+
+        if wanted("load_datasets_excel"):
+            results.append(measure(
+                "load_datasets_excel", load_datasets_excel, repeat,
+                setup=lambda: (load_datasets_excel.clear(), clear_cache()), **context,
+            ))
+
+        if wanted("load_player_data"):
+            results.append(measure(
+                "load_player_data[cold]", lambda: load_player_data(path), repeat,
+                setup=lambda: (load_player_data.clear(), clear_cache()), **context,
+            ))
+            load_player_data(path)
+            results.append(measure(
+                "load_player_data[shared store]", lambda: load_player_data(path), repeat,
+                setup=load_player_data.clear, **context,
+            ))
+
+        if wanted("read_player_data"):
+            # Peak memory of the streamed read follows the filtered, projected output
+            results.append(measure(
+                "read_player_data[streaming]", lambda: read_player_data(path), repeat, setup=clear_cache, **context,
+            ))
+            results.append(measure(
+                "read_player_data[columnar copy]", lambda: read_player_data(path), repeat,
+                setup=lambda: read_player_data(path), **context,
+            ))
+
+        players_df = load_player_data(path)
+        processor = StatsProcessor(players_df)
+        processor.create_columns()
+        stats = [stat for stat in Stats.CENTRAL_MIDFIELDER.value if stat in processor.players_df.columns]
+
+        if wanted("create_columns"):
+            def create_columns():
+                StatsProcessor(players_df).create_columns()
+            results.append(measure("StatsProcessor.create_columns", create_columns, repeat, **context))
+
+        if wanted("get_normalized_stats"):
+            def normalize_all_players():
+                # Fresh processor so bounds are computed inside the measurement
+                fresh = StatsProcessor(processor.players_df)
+                for _, row in fresh.players_df.iterrows():
+                    fresh.get_normalized_stats(row, stats)
+            results.append(measure("get_normalized_stats[all players]", normalize_all_players, repeat, **context))
+
+            def normalize_vectorized():
+                NormalizationIndex(processor.players_df).normalize_players(processor.players_df, stats)
+            results.append(measure("NormalizationIndex.normalize_players", normalize_vectorized, repeat, **context))
+
+        if wanted("RadarChartPlotter"):
+            rows = [processor.players_df.iloc[i] for i in range(2)]
+            normalized = [processor.get_normalized_stats(row, stats) for row in rows]
+            real = [row[stats] for row in rows]
+            names = [str(row["Full name"]) for row in rows]
+
+            results.append(measure(
+                "RadarChartPlotter.render[uncached]",
+                lambda: RadarChartPlotter.render(normalized, real, names, stats, cache=None), repeat, **context,
+            ))
+            results.append(measure(
+                "RadarChartPlotter.render[svg]",
+                lambda: RadarChartPlotter.render(normalized, real, names, stats, cache=None, renderer=SVG), repeat, **context,
+            ))
+            many_stats = processor.get_numeric_stats_columns()[:40]
+            results.append(measure(
+                "RadarChartPlotter.render[svg, 40 stats]",
+                lambda: RadarChartPlotter.render(
+                    [processor.get_normalized_stats(row, many_stats) for row in rows], [row[many_stats] for row in rows],
+                    names, many_stats, cache=None, renderer=SVG,
+                ), repeat, **context,
+            ))
+            cache = RenderCache()
+            RadarChartPlotter.render(normalized, real, names, stats, cache=cache)
+            results.append(measure(
+                "RadarChartPlotter.render[cached]",
+                lambda: RadarChartPlotter.render(normalized, real, names, stats, cache=cache), repeat, **context,
+            ))
+            results.append(measure(
+                "RadarChartPlotter.plot", lambda: RadarChartPlotter.plot(normalized, real, names, stats), repeat,
+                setup=RENDER_CACHE.clear, **context,
+            ))
+            results.append(measure(
+                "RadarChartPlotter.plot[svg]", lambda: RadarChartPlotter.plot(normalized, real, names, stats, renderer=SVG), repeat,
+                setup=RENDER_CACHE.clear, **context,
+            ))
+
+        if wanted("app"):
+            results.extend(_measure_app(repeat, context))
+
+    return results
+
+
+def _measure_app(repeat: int, context: dict) -> list:
+    # Full script run of the app through Streamlit's test harness, no browser involved
+    from streamlit.testing.v1 import AppTest
+
+    def new_app():
+        app = AppTest.from_file(os.path.join(REPO_DIR, "streamlit_app.py"), default_timeout=600)
+        app.run()
+        role = next(box for box in app.sidebar.selectbox if box.label.startswith("Select role"))
+        role.select("Central Midfielder")
+        return app
+
+    import streamlit as st
+
+    results = []
+    holder = {}
+
+    def cold_caches():
+        st.cache_data.clear()
+        st.cache_resource.clear()
+
+    def first_run():
+        holder["app"] = new_app()
+        holder["app"].run()
+
+    results.append(measure("PlayerComparisonApp.run[first]", first_run, 1, setup=cold_caches, **context))
+
+    def rerun():
+        holder["app"].run()
+
+    results.append(measure("PlayerComparisonApp.run[rerun]", rerun, repeat, **context))
+    return results
+
+
+# === Reporting ===
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def metadata(args) -> dict:
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "repeat": args.repeat,
+        "seasons": args.seasons,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    baseline_results = {(result["name"], result.get("scale")): result for result in baseline["results"]}
+    regressions = []
+    print(f"\nComparison with {baseline['meta'].get('commit')} (regression above {threshold:.2f}x):")
+    for result in current["results"]:
+        previous = baseline_results.get((result["name"], result.get("scale")))
+        if previous is None:
+            continue
+        ratio = result["wall_s"]["median"] / max(previous["wall_s"]["median"], 1e-12)
+        flag = "REGRESSION" if ratio > threshold else ""
+        print(f"  {result['name']:<40} x{result.get('scale', 1):<4} {ratio:6.2f}x {flag}")
+        if ratio > threshold:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the load, derive, normalize and render hot paths.")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], help="Row multipliers for synthetic workbooks, e.g. 1 10 100")
+    parser.add_argument("--seasons", type=int, default=0, help="Extra synthetic league-seasons in the registry")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="Run only benchmarks whose name contains one of these strings")
+    parser.add_argument("--output", help="Result file (default: benchmark_results/<commit>-<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    cache_dir = use_own_cache()
+    sys.path.insert(0, REPO_DIR)
+    report = {"meta": metadata(args), "results": []}
+    try:
+        for scale in args.scale:
+            print(f"Scale x{scale}, {args.seasons} extra seasons")
+            workspace = prepare_workspace(scale, args.seasons)
+            for result in run_suite(workspace, args.repeat, cache_dir, args.only):
+                result["scale"] = scale
+                report["results"].append(result)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{report['meta']['commit']}-{report['meta']['timestamp'].replace(':', '')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle))
+        if regressions and args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,307 @@
-import matplotlib.pyplot as plt
+from collections import OrderedDict
+import hashlib
+import io
+import threading
+from xml.sax.saxutils import escape
+
+import matplotlib as mpl
+from matplotlib.figure import Figure
 import numpy as np
 import streamlit as st
 
-class RadarChartPlotter:
-    @staticmethod
-    def plot(normalized_stats_list, real_stats_list, player_names, categories):
-        num_vars = len(categories)
+from instrumentation import annotate, timed
+
+# Same output st.pyplot produces
+IMAGE_SAVE_OPTIONS = {"format": "png", "dpi": 200}
+
+MATPLOTLIB = "matplotlib"
+SVG = "svg"
+RENDERERS = (MATPLOTLIB, SVG)
+
+
+class RadarTemplate:
+    # Polar figure with the gridlines and category labels drawn once. Each player slot (line, fill
+    # and value labels) is created on first use and then only moved, relabelled and shown or
+    # hidden, so many charts can share one figure without rebuilding any artist.
+    def __init__(self, categories, figsize=(6, 6)):
+        self.categories = list(categories)
+        num_vars = len(self.categories)
         angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-        angles += angles[:1]
+        self.angles = angles + angles[:1]
+
+        # Not registered with pyplot, so cached templates stay open without piling up there
+        self.fig = Figure(figsize=figsize)
+        self.ax = self.fig.add_subplot(polar=True)
+        self.ax.set_thetagrids(np.degrees(self.angles[:-1]), self.categories, fontsize=8)
+        self.ax.set_ylim(0, 1)
+        self._slots = []
+        # Artists are shared between charts, one draw and save at a time per figure
+        self.lock = threading.Lock()
+
+    def _slot(self, i: int):
+        while len(self._slots) <= i:
+            colors = mpl.rcParams["axes.prop_cycle"].by_key()["color"]
+            color = colors[len(self._slots) % len(colors)]
+            line, = self.ax.plot(self.angles, np.zeros(len(self.angles)), color=color)
+            fill, = self.ax.fill(self.angles, np.zeros(len(self.angles)), color=color, alpha=0.25)
+            labels = [
+                self.ax.text(angle, 0, "", ha='center', va='center', fontsize=8, color=color)
+                for angle in self.angles[:-1]
+            ]
+            self._slots.append((line, fill, labels))
+        return self._slots[i]
+
+    def clear(self):
+        for line, fill, labels in self._slots:
+            for artist in [line, fill, *labels]:
+                artist.set_visible(False)
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        self.ax.set_title("")
+
+    def draw(self, normalized_stats_list, real_stats_list, player_names, title=None):
+        self.clear()
+
+        # Close the polygons by repeating the first value
+        normalized = np.asarray([list(stats) for stats in normalized_stats_list], dtype=float).reshape(-1, len(self.categories))
+        real = np.asarray([list(stats) for stats in real_stats_list], dtype=float).reshape(-1, len(self.categories))
+        closed = np.hstack([normalized, normalized[:, :1]])
+
+        lines = []
+        for i, name in enumerate(player_names):
+            line, fill, labels = self._slot(i)
+            line.set_ydata(closed[i])
+            line.set_label(name)
+            fill.set_xy(np.column_stack([self.angles, closed[i]]))
+            for label, angle, norm_val, real_val in zip(labels, self.angles, normalized[i], real[i]):
+                label.set_position((angle, norm_val + 0.02))
+                label.set_text(f"{real_val:.2f}")
+                label.set_visible(True)
+            line.set_visible(True)
+            fill.set_visible(True)
+            lines.append(line)
+
+        # Keep the grid fixed even if values fall outside [0, 1]
+        self.ax.set_ylim(0, 1)
+        self.ax.legend(handles=lines, loc='upper right', bbox_to_anchor=(1.1, 1.1))
+        if title:
+            self.ax.set_title(title, pad=20)
+        return self.fig
+
+    def save(self, path, **kwargs):
+        self.fig.savefig(path, bbox_inches='tight', **kwargs)
+
+    def close(self):
+        # Nothing is registered with pyplot; dropping the template releases the figure
+        self._slots.clear()
+        self.fig.clear()
+
+
+class RadarSVG:
+    # Same layout as RadarTemplate (theta 0 at east, counter-clockwise, rings every 0.2) written
+    # straight to SVG. Geometry for every player and stat is computed in one NumPy pass, and
+    # the browser lays out the text, so the cost no longer grows with matplotlib text artists.
+    RADIUS = 220
+    MARGIN_X = 230
+    MARGIN_Y = 90
+    RINGS = (0.2, 0.4, 0.6, 0.8, 1.0)
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self.angles = np.linspace(0, 2 * np.pi, len(self.categories), endpoint=False)
+        self.width = 2 * (self.RADIUS + self.MARGIN_X)
+        self.height = 2 * (self.RADIUS + self.MARGIN_Y)
+        self.cx = self.width / 2
+        self.cy = self.height / 2
+        # The grid only depends on the categories, so it is built once per template
+        self.grid = self._grid()
+
+    def _points(self, radii: np.ndarray):
+        # radii: players × stats → x and y arrays of the same shape
+        return self.cx + self.RADIUS * radii * np.cos(self.angles), self.cy - self.RADIUS * radii * np.sin(self.angles)
+
+    def _grid(self) -> str:
+        parts = [
+            f'<circle cx="{self.cx:.1f}" cy="{self.cy:.1f}" r="{self.RADIUS * ring:.1f}" fill="none" stroke="#b0b0b0" stroke-width="0.8"/>'
+            for ring in self.RINGS
+        ]
+        parts.extend(
+            f'<text x="{self.cx + 3:.1f}" y="{self.cy - self.RADIUS * ring - 2:.1f}" font-size="10" fill="#555">{ring:g}</text>'
+            for ring in self.RINGS
+        )
+        xs, ys = self._points(np.ones((1, len(self.categories))))
+        spokes = "".join(f"M{self.cx:.1f},{self.cy:.1f}L{x:.1f},{y:.1f}" for x, y in zip(xs[0], ys[0]))
+        parts.append(f'<path d="{spokes}" stroke="#b0b0b0" stroke-width="0.8"/>')
 
-        normalized_stats_list = [list(stats) + [stats[0]] for stats in normalized_stats_list]
-        real_stats_list = [list(stats) + [stats[0]] for stats in real_stats_list]
+        label_xs, label_ys = self._points(np.full((1, len(self.categories)), 1.08))
+        cosines = np.cos(self.angles)
+        anchors = np.where(cosines > 0.1, "start", np.where(cosines < -0.1, "end", "middle"))
+        parts.extend(
+            f'<text x="{x:.1f}" y="{y:.1f}" text-anchor="{anchor}" dominant-baseline="middle" font-size="11">{escape(str(name))}</text>'
+            for x, y, anchor, name in zip(label_xs[0], label_ys[0], anchors, self.categories)
+        )
+        return "".join(parts)
 
-        fig, ax = plt.subplots(figsize=(6, 6), subplot_kw=dict(polar=True))
+    def draw(self, normalized_stats_list, real_stats_list, player_names, title=None) -> str:
+        normalized = np.asarray([list(stats) for stats in normalized_stats_list], dtype=float).reshape(-1, len(self.categories))
+        real = np.asarray([list(stats) for stats in real_stats_list], dtype=float).reshape(-1, len(self.categories))
+        colors = mpl.rcParams["axes.prop_cycle"].by_key()["color"]
 
-        for norm_stats, real_stats, name in zip(normalized_stats_list, real_stats_list, player_names):
-            line = ax.plot(angles, norm_stats, label=name)
-            ax.fill(angles, norm_stats, alpha=0.25)
+        # Missing values sit at the centre, their annotation still reads "nan" like the matplotlib chart
+        xs, ys = self._points(np.nan_to_num(normalized, nan=0.0))
+        label_xs, label_ys = self._points(np.nan_to_num(normalized, nan=0.0) + 0.02)
 
-            color = line[0].get_color()
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {self.width:.0f} {self.height:.0f}" '
+            f'width="{self.width:.0f}" height="{self.height:.0f}" font-family="DejaVu Sans, sans-serif">',
+            '<rect width="100%" height="100%" fill="white"/>',
+            self.grid,
+        ]
+        for i, name in enumerate(player_names):
+            color = colors[i % len(colors)]
+            points = " ".join(f"{x:.1f},{y:.1f}" for x, y in zip(xs[i], ys[i]))
+            parts.append(f'<polygon points="{points}" fill="{color}" fill-opacity="0.25" stroke="{color}" stroke-width="1.5"/>')
+            # All value annotations of a player in one text element
+            parts.append(f'<text font-size="10" fill="{color}" text-anchor="middle" dominant-baseline="middle">')
+            parts.extend(
+                f'<tspan x="{x:.1f}" y="{y:.1f}">{value:.2f}</tspan>' for x, y, value in zip(label_xs[i], label_ys[i], real[i])
+            )
+            parts.append("</text>")
 
-            for angle, norm_val, real_val in zip(angles, norm_stats, real_stats):
-                ax.text(angle, norm_val + 0.02, f"{real_val:.2f}", ha='center', va='center', fontsize=8, color=color)
+        legend_x = self.width - 200
+        for i, name in enumerate(player_names):
+            color = colors[i % len(colors)]
+            y = 20 + 18 * i
+            parts.append(f'<rect x="{legend_x}" y="{y - 6}" width="14" height="3" fill="{color}"/>')
+            parts.append(f'<text x="{legend_x + 20}" y="{y}" font-size="11" dominant-baseline="middle">{escape(str(name))}</text>')
+        if title:
+            parts.append(f'<text x="{self.cx:.1f}" y="24" text-anchor="middle" font-size="14">{escape(str(title))}</text>')
+        parts.append("</svg>")
+        return "".join(parts)
 
 
-        ax.set_thetagrids(np.degrees(angles[:-1]), categories, fontsize=8)
-        ax.set_ylim(0, 1)
-        ax.legend(loc='upper right', bbox_to_anchor=(1.1, 1.1))
-        st.pyplot(fig)
\ No newline at end of file
+class RenderCache:
+    # Encoded chart images with LRU eviction under a memory budget in bytes
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image: bytes):
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= len(self._entries.pop(key))
+            self._entries[key] = image
+            self.current_bytes += len(image)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+RENDER_CACHE = RenderCache()
+
+# Chart templates (grids, labels, reusable artists) kept per renderer and set of stats
+TEMPLATE_LIMIT = 32
+_TEMPLATES = OrderedDict()
+_TEMPLATES_LOCK = threading.Lock()
+
+
+def render_cache_key(normalized_stats_list, real_stats_list, player_names, categories, mode=None, renderer=MATPLOTLIB) -> str:
+    # Everything that changes the pixels: players (names carry the season), stats, values, normalization and output
+    normalized = np.asarray([list(stats) for stats in normalized_stats_list], dtype=float)
+    real = np.asarray([list(stats) for stats in real_stats_list], dtype=float)
+    digest = hashlib.sha1()
+    digest.update(repr((list(player_names), list(categories), mode, renderer)).encode("utf-8"))
+    digest.update(np.round(normalized, 6).tobytes())
+    digest.update(np.round(real, 6).tobytes())
+    return digest.hexdigest()
+
+
+class RadarChartPlotter:
+    @staticmethod
+    @timed("RadarChartPlotter.render", cached=True)
+    def render(normalized_stats_list, real_stats_list, player_names, categories, mode=None, cache: RenderCache = RENDER_CACHE,
+               renderer: str = MATPLOTLIB) -> bytes:
+        # PNG bytes from matplotlib, or UTF-8 SVG markup from the lightweight renderer
+        if renderer not in RENDERERS:
+            raise ValueError(f"Unknown renderer '{renderer}', expected one of {', '.join(RENDERERS)}")
+        key = render_cache_key(normalized_stats_list, real_stats_list, player_names, categories, mode, renderer)
+        image = cache.get(key) if cache is not None else None
+        if image is not None:
+            return image
+
+        if renderer == SVG:
+            image = RadarChartPlotter.template(categories, SVG).draw(normalized_stats_list, real_stats_list, player_names).encode("utf-8")
+            annotate(cache="miss", bytes=len(image))
+            if cache is not None:
+                cache.put(key, image)
+            return image
+
+        # PNG export stays the slower path: the template and its artists are reused, but Agg still
+        # lays out every category and value label on each save. The app draws with the SVG renderer.
+        template = RadarChartPlotter.template(categories)
+        with template.lock:
+            template.draw(normalized_stats_list, real_stats_list, player_names)
+            buffer = io.BytesIO()
+            template.save(buffer, **IMAGE_SAVE_OPTIONS)
+            image = buffer.getvalue()
+
+        annotate(cache="miss", bytes=len(image))
+        if cache is not None:
+            cache.put(key, image)
+        return image
+
+    @staticmethod
+    def template(categories, renderer: str = MATPLOTLIB):
+        # Grids are reused for every chart with the same stats
+        key = (renderer, tuple(categories))
+        with _TEMPLATES_LOCK:
+            template = _TEMPLATES.get(key)
+            if template is None:
+                template = _TEMPLATES[key] = RadarSVG(categories) if renderer == SVG else RadarTemplate(categories)
+                if len(_TEMPLATES) > TEMPLATE_LIMIT:
+                    _TEMPLATES.popitem(last=False)
+            else:
+                _TEMPLATES.move_to_end(key)
+            return template
+
+    @staticmethod
+    @timed("RadarChartPlotter.plot")
+    def plot(normalized_stats_list, real_stats_list, player_names, categories, mode=None, renderer: str = MATPLOTLIB):
+        # Repeated views are served from the render cache without touching matplotlib
+        image = RadarChartPlotter.render(normalized_stats_list, real_stats_list, player_names, categories, mode, renderer=renderer)
+        st.image(image.decode("utf-8") if renderer == SVG else image)
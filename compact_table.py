@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+# Largest integer float32 represents exactly; bigger integer columns (ids...) keep their dtype
+FLOAT32_EXACT_INT = 2 ** 24
+TEXT_CATEGORY_MAX_RATIO = 0.5
+
+
+class CompactPlayerTable:
+    # Processed player data as one contiguous float32 stats block (rows × stats) with a
+    # column-name index, plus dictionary-encoded text. `frame` is a DataFrame over the
+    # same memory, so pandas consumers keep working without a copy.
+    def __init__(self, stats: np.ndarray, stat_columns: list[str], other_columns: dict, column_order: list[str], index=None):
+        self.stats = np.ascontiguousarray(stats, dtype=np.float32)
+        self.stats.setflags(write=False)
+        self.stat_columns = list(stat_columns)
+        self.stat_index = {col: i for i, col in enumerate(self.stat_columns)}
+        self.other_columns = dict(other_columns)
+        self.column_order = list(column_order)
+        self.index = index if index is not None else pd.RangeIndex(len(self.stats))
+        self._frame = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "CompactPlayerTable":
+        stat_columns = []
+        other_columns = {}
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+                other_columns[column] = _encode_text(series)
+            elif pd.api.types.is_integer_dtype(series) and series.abs().max() >= FLOAT32_EXACT_INT:
+                other_columns[column] = series.to_numpy()
+            else:
+                stat_columns.append(column)
+
+        stats = df[stat_columns].to_numpy(dtype=np.float32) if stat_columns else np.empty((len(df), 0), dtype=np.float32)
+        return cls(stats, stat_columns, other_columns, list(df.columns), df.index)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        # Built once; the stat columns are views into `stats`
+        if self._frame is None:
+            stats_df = pd.DataFrame(self.stats, columns=self.stat_columns, index=self.index, copy=False)
+            other_df = pd.DataFrame(self.other_columns, index=self.index)
+            self._frame = pd.concat([stats_df, other_df], axis=1)[self.column_order]
+        return self._frame
+
+    def __len__(self):
+        return len(self.stats)
+
+    def column(self, name: str) -> np.ndarray:
+        # Strided view, no copy
+        return self.stats[:, self.stat_index[name]]
+
+    def block(self, columns: list[str], rows=None) -> np.ndarray:
+        positions = [self.stat_index[col] for col in columns]
+        if rows is None:
+            return self.stats[:, positions]
+        return self.stats[np.ix_(np.asarray(rows, dtype=int), positions)]
+
+    def row(self, position: int) -> np.ndarray:
+        return self.stats[position]
+
+    @property
+    def nbytes(self) -> int:
+        other = 0
+        for values in self.other_columns.values():
+            if isinstance(values, pd.Categorical):
+                other += values.codes.nbytes + sum(len(str(category)) for category in values.categories)
+            else:
+                other += values.nbytes
+        return self.stats.nbytes + other
+
+
+def _encode_text(series: pd.Series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.array
+    # Low-cardinality text (teams, positions, countries, tags) is stored once per distinct value
+    if series.nunique(dropna=True) <= TEXT_CATEGORY_MAX_RATIO * max(len(series), 1):
+        return pd.Categorical(series)
+    return series.to_numpy()
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
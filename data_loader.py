@@ -1,31 +1,85 @@
+import logging
 import pandas as pd
 import streamlit as st
 import os
+from dataset_cache import (_cache_prefix, _write_cache, get_artifact_path, get_workbook_version, read_workbook,
+                           remove_stale_artifacts)
+from instrumentation import annotate, span
+from shared_store import SHARED_STORE, shared_name
+from workbook_reader import PROJECTION_VERSION, is_complete, stream_player_data
 
-# Cache the loading of the Excel file
-@st.cache_data
-def load_datasets_excel(path="datasets.xlsx"):
-    df = pd.read_excel(path)
+DATASETS_DIR = "datasets"
+MINUTES_COLUMN = "Minutes played"
+
+logger = logging.getLogger(__name__)
+
+def read_datasets_registry(path="datasets.xlsx"):
+    df = read_workbook(path)
     df.columns = df.columns.str.strip().str.upper()
     df["YEAR"] = df["YEAR"].astype(str).str.strip()
     return df
 
-@st.cache_data
-def load_player_data(path, min_minutes=600):
-    df = pd.read_excel(path)
-    df.columns = [col.strip() for col in df.columns]
+# Cache the loading of the Excel file. cache_resource hands every session the same
+# read-only frame instead of unpickling a copy on each hit, see shared_store.
+@st.cache_resource
+def load_datasets_excel(path="datasets.xlsx"):
+    name = shared_name("registry", _cache_prefix(path), get_workbook_version(path))
+    df = SHARED_STORE.frame(name, lambda: read_datasets_registry(path))
+    annotate(cache="miss", rows=len(df))
+    return df
 
-    # Filter by "Minutes played"
-    if "Minutes played" in df.columns:
-        df = df[df["Minutes played"] > min_minutes]
-    else:
-        st.warning(f"'Minutes played' column not found in dataset: {path}")
+def get_player_copy_path(path, min_minutes=600):
+    # Columnar copy of the projected, filtered players, one per workbook version and threshold
+    return get_artifact_path("players", (get_workbook_version(path), PROJECTION_VERSION), (_cache_prefix(path), min_minutes),
+                             extension=".parquet")
+
+def read_player_data(path, min_minutes=600, on_progress=None):
+    # Only the columns the app uses and the players above the minutes threshold are kept. The
+    # workbook is streamed row by row, so the raw sheet is never held in memory, and the result
+    # is written to a columnar copy that later reads come from.
+    copy_path = get_player_copy_path(path, min_minutes)
+    if os.path.exists(copy_path):
+        try:
+            return pd.read_parquet(copy_path)
+        except Exception:
+            pass  # corrupt or unreadable copy, streamed again below
+
+    df = stream_player_data(path, min_minutes, on_progress=on_progress)
+    if is_complete(df):
+        try:
+            _write_cache(df, copy_path)
+            remove_stale_artifacts(copy_path)
+        except Exception:
+            pass  # the copy is best effort, like the workbook copies
+    return df
 
+def read_shared_player_data(path, min_minutes=600, on_progress=None):
+    # Stats are memory-mapped from the shared store, one physical copy per host. No st.* call,
+    # so background threads (see prefetch.py) can use it
+    name = shared_name("players", (_cache_prefix(path), min_minutes), (get_workbook_version(path), PROJECTION_VERSION))
+    return SHARED_STORE.frame(name, lambda: read_player_data(path, min_minutes, on_progress), cacheable=is_complete)
+
+# A partial read is returned once and read again on the next call. The progress callback is
+# not part of the cache key (leading underscore).
+@st.cache_resource(validate=is_complete)
+def load_player_data(path, min_minutes=600, _on_progress=None):
+    df = read_shared_player_data(path, min_minutes, _on_progress)
+    if MINUTES_COLUMN not in df.columns:
+        st.warning(f"'{MINUTES_COLUMN}' column not found in dataset: {path}")
+    if not is_complete(df):
+        st.warning(f"Only the first {len(df)} players of {path} could be read, the workbook looks truncated")
+
+    annotate(cache="miss", rows=len(df))
     return df
 
 class DatasetLoader:
-    def __init__(self):
-        self.datasets_df = load_datasets_excel()
+    def __init__(self, datasets_df=None):
+        # Headless callers pass the registry read with read_datasets_registry
+        if datasets_df is not None:
+            self.datasets_df = datasets_df
+            return
+        with span("load_datasets_excel", cache="hit"):
+            self.datasets_df = load_datasets_excel()
 
     def get_years(self):
         years = self.datasets_df["YEAR"].dropna().astype(str).str.strip().unique().tolist()
@@ -58,8 +112,13 @@ class DatasetLoader:
         if not isinstance(path_value, str):
             raise TypeError(f"Expected string for path, got {type(path_value)}: {path_value}")
 
-        return os.path.join("datasets", path_value)
+        return os.path.join(DATASETS_DIR, path_value)
+
 
+    def get_registered_datasets(self):
+        # (league, year) pairs of every workbook listed in the registry
+        rows = self.datasets_df.dropna(subset=["LEAGUE", "YEAR", "PATH"])
+        return [(league.strip(), str(year).strip()) for league, year in zip(rows["LEAGUE"], rows["YEAR"])]
 
     def get_metadata(self):
         return self.datasets_df.copy()
\ No newline at end of file
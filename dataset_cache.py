@@ -0,0 +1,123 @@
+import glob
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Directory holding the columnar copies of the Excel workbooks
+CACHE_DIR = os.environ.get("DATASET_CACHE_DIR", ".dataset_cache")
+CACHE_EXTENSION = ".parquet"
+
+
+def _cache_prefix(path):
+    # One slot per source workbook, e.g. "Romanian-Superliga-24-25.xlsx" → "Romanian-Superliga-24-25-<path hash>"
+    name = os.path.splitext(os.path.basename(path))[0]
+    path_hash = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return f"{name}-{path_hash}"
+
+
+def get_workbook_version(path):
+    # Changes whenever the workbook is modified
+    stat = os.stat(path)
+    return hashlib.sha1(f"{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8")).hexdigest()[:12]
+
+
+def get_cache_path(path):
+    # Keyed by the workbook version, so a stale copy is never read
+    return os.path.join(CACHE_DIR, f"{_cache_prefix(path)}-{get_workbook_version(path)}{CACHE_EXTENSION}")
+
+
+def _remove_stale_entries(path, keep):
+    for stale_path in glob.glob(os.path.join(CACHE_DIR, f"{glob.escape(_cache_prefix(path))}-*{CACHE_EXTENSION}")):
+        if stale_path != keep:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+
+
+def _write_cache(df, cache_path):
+    # Write to a temporary file first so concurrent readers never see a partial file
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_workbook(path):
+    # Read an Excel workbook through the on-disk columnar cache
+    cache_path = get_cache_path(path)
+
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception:
+            pass  # corrupt or unreadable cache entry, rebuild it below
+
+    df = pd.read_excel(path)
+
+    try:
+        _write_cache(df, cache_path)
+        _remove_stale_entries(path, keep=cache_path)
+    except Exception:
+        # Caching is best effort (read-only filesystem, missing pyarrow, mixed-type columns...)
+        pass
+
+    return df
+
+
+def get_artifact_path(name, key, scope=(), extension=".npz"):
+    # Derived artifacts (similarity indexes, clusters...) live next to the workbook copies.
+    # "<name>-<scope hash>-<key hash>": artifacts of one scope (e.g. a league-season) replace each other
+    scope_digest = hashlib.sha1(repr(scope).encode("utf-8")).hexdigest()[:8]
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"{name}-{scope_digest}-{digest}{extension}")
+
+
+def remove_stale_artifacts(path):
+    # Artifacts of the same name and scope built for an older workbook version, schema or filter
+    directory, file_name = os.path.split(path)
+    stem, extension = os.path.splitext(file_name)
+    prefix = stem.rsplit("-", 1)[0]
+    for stale_path in glob.glob(os.path.join(directory, f"{glob.escape(prefix)}-*{extension}")):
+        if stale_path != path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+
+
+def save_arrays(path, **arrays):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    try:
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_arrays(path):
+    # None when the artifact is missing or unreadable, callers then rebuild it
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+    except Exception:
+        return None
+
+
+def clear_cache():
+    for cache_path in glob.glob(os.path.join(CACHE_DIR, "*")):
+        if os.path.isfile(cache_path):
+            os.remove(cache_path)
+        elif os.path.isdir(cache_path):
+            shutil.rmtree(cache_path, ignore_errors=True)
@@ -16,8 +16,21 @@ class Position(Enum):
     def __str__(self):
         return self.name.replace("_", " ").title()
 
+    @classmethod
+    def from_code(cls, code):
+        # Map a raw Wyscout position code (e.g. "LCB3", "RAMF") to its group, None when unknown
+        if not isinstance(code, str):
+            return None
+        code = code.strip()
+        for position in cls:
+            if code in position.value:
+                return position
+        return None
+
 class Stats(Enum):
-    GOALKEEPER = []
+    GOALKEEPER = ["Prevented goals per 90", "Save rate, %", "Saves per 90", "Clean sheets per match", "Shots against per 90",
+                  "xG against per 90", "Exits per 90", "Aerial duels per 90", "Back passes received as GK per 90",
+                  "Accurate passes, %", "Long passes per 90", "Accurate long passes, %"]
     CENTER_BACK = ["Duels per 90", "Duels won per 90", "Defensive duels per 90", "Defensive duels won per 90", "Aerial duels per 90",
                    "Aerial duels won per 90", "Sliding tackles per 90", "Shots blocked per 90", "Interceptions per 90", "Successful defensive actions per 90",
                    "PAdj Sliding tackles", "PAdj Interceptions"]
@@ -37,8 +50,30 @@ class Stats(Enum):
               "Shot efficiency"]
     STRIKER = ["Goals per 90", "xG per 90", "Assists per 90", "xA per 90", "Shots per 90", "Shots on target per 90", "Touches in box per 90", "Offensive duels won per 90",
                             "Shot efficiency", "Aerial duels won per 90", "Aerial duels per 90", "Fouls suffered per 90", "Progressive runs per 90"]
+
+    @property
+    def positions(self):
+        # Position groups a role profile applies to
+        return ROLE_POSITIONS[self.name]
+
+    @classmethod
+    def all_values(cls):
+        # Every metric used by any role profile, once, in declaration order
+        return list(dict.fromkeys(stat for item in cls for stat in item.value))
     
 
+ROLE_POSITIONS = {
+    "GOALKEEPER": [Position.GOALKEEPER],
+    "CENTER_BACK": [Position.CENTER_BACK],
+    "FULL_BACK": [Position.RIGHT_BACK, Position.LEFT_BACK],
+    "DEFENSIVE_MIDFIELDER": [Position.DEFENSIVE_MIDFIELDER],
+    "CENTRAL_MIDFIELDER": [Position.CENTRAL_MIDFIELDER],
+    "ATTACKING_MIDFIELDER": [Position.ATTACKING_MIDFIELDER],
+    "WINGER": [Position.LEFT_WINGER, Position.RIGHT_WINGER],
+    "STRIKER": [Position.STRIKER],
+}
+
+
 class ExistentFieldPlayerColumn(Enum):
     HEIGHT = "Height"
     MATCHES_PLAYED = "Matches played"
@@ -155,7 +190,7 @@ class ExistentFieldPlayerColumn(Enum):
             "Head goals per 90",
             "Shot assists per 90",
             "Second assists per 90",
-            "Third assists per 90"
+            "Third assists per 90",
             "Shot efficiency"
         }
         
@@ -207,11 +242,23 @@ class ToCreateColumns(Enum):
     ACCURATE_PROGRESSIVE_PASSES_PER_90 = "Accurate progressive passes per 90"
     ACCURATE_VERTICAL_PASSES_PER_90 = "Accurate vertical passes per 90"
     DIRECT_FREE_KICKS_ON_TARGET_PER_90 = "Direct free kicks on target per 90"
+    SAVES_PER_90 = "Saves per 90"
+    CLEAN_SHEETS_PER_MATCH = "Clean sheets per match"
+    CONCEDED_GOALS_PER_XG_AGAINST = "Conceded goals per xG against"
 
     def __str__(self):
             return self.name.replace("_", " ").title()
 
 class ColumnMapping:
+    # new column -> (numerator, denominator), 0 when the denominator is 0
+    RATIO_MAPPING = {
+        ToCreateColumns.SHOT_EFFICIENCY.value: (
+            ExistentFieldPlayerColumn.GOALS_PER_90.value,
+            ExistentFieldPlayerColumn.XG_PER_90.value
+        ),
+    }
+
+    # new column -> (base per 90 column, success percentage column)
     COLUMN_MAPPING = {
         ToCreateColumns.DUELS_WON_PER_90.value: (
             ExistentFieldPlayerColumn.DUELS_PER_90.value,
@@ -299,4 +346,21 @@ class ColumnMapping:
         ),
     }
 
+    # Keeper-only metrics, derived for goalkeepers alone (see stats_processor.GoalkeeperStatsProcessor)
+    GOALKEEPER_RATIO_MAPPING = {
+        ToCreateColumns.CLEAN_SHEETS_PER_MATCH.value: (
+            ExistentGoalkeeperColumn.CLEAN_SHEETS.value,
+            ExistentFieldPlayerColumn.MATCHES_PLAYED.value
+        ),
+        ToCreateColumns.CONCEDED_GOALS_PER_XG_AGAINST.value: (
+            ExistentGoalkeeperColumn.CONCEDED_GOALS.value,
+            ExistentGoalkeeperColumn.XG_AGAINST.value
+        ),
+    }
 
+    GOALKEEPER_COLUMN_MAPPING = {
+        ToCreateColumns.SAVES_PER_90.value: (
+            ExistentGoalkeeperColumn.SHOTS_AGAINST_PER_90.value,
+            ExistentGoalkeeperColumn.SAVE_RATE_PERCENTAGE.value
+        ),
+    }
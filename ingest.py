@@ -0,0 +1,182 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import CACHE_DIR, read_workbook
+from enums import ExistentFieldPlayerColumn, ExistentGoalkeeperColumn, ToCreateColumns
+
+STORE_PATH = os.path.join(CACHE_DIR, "players_store.parquet")
+
+# Descriptive columns that should stay text; low-cardinality ones become categoricals
+IDENTITY_COLUMNS = ["Player", "Full name", "Team", "Team within selected timeframe", "Competition", "Position",
+                    "Primary position", "Secondary position", "Third position", "Birth country", "Passport country", "Foot"]
+DATE_COLUMNS = ["Birthday", "Contract expires"]
+CATEGORY_MAX_RATIO = 0.5
+SEASON_KEY = "Season key"
+
+
+class ValidationReport:
+    def __init__(self, league: str, year: str, path: str):
+        self.league = league
+        self.year = year
+        self.path = path
+        self.rows = 0
+        self.missing_field_columns = []
+        self.missing_goalkeeper_columns = []
+        self.coerced_columns = {}  # column -> number of values that were not numeric
+        self.error = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.missing_field_columns
+
+    def summary(self) -> str:
+        if self.error:
+            return f"[FAILED] {self.league} {self.year} ({self.path}): {self.error}"
+        status = "OK" if self.ok else "WARN"
+        lines = [f"[{status}] {self.league} {self.year}: {self.rows} rows"]
+        if self.missing_field_columns:
+            lines.append(f"  missing field player columns: {', '.join(self.missing_field_columns)}")
+        if self.missing_goalkeeper_columns:
+            lines.append(f"  missing goalkeeper columns: {', '.join(self.missing_goalkeeper_columns)}")
+        for column, count in self.coerced_columns.items():
+            lines.append(f"  {count} non-numeric values set to NaN in '{column}'")
+        return "\n".join(lines)
+
+
+def _goalkeeper_columns(df: pd.DataFrame) -> dict:
+    # Wyscout exports "Aerial duels per 90" twice; pandas names the goalkeeper copy "... .1"
+    mapping = {}
+    for column in ExistentGoalkeeperColumn.all_values():
+        if f"{column}.1" in df.columns:
+            mapping[column] = f"{column}.1"
+        elif column in df.columns:
+            mapping[column] = column
+    return mapping
+
+
+def coerce_dtypes(df: pd.DataFrame, numeric_columns, report: ValidationReport = None) -> pd.DataFrame:
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+
+        if column in numeric_columns:
+            numeric = pd.to_numeric(series, errors="coerce")
+            invalid = int((numeric.isna() & series.notna()).sum())
+            if invalid and report is not None:
+                report.coerced_columns[column] = invalid
+            series = numeric
+        elif column in DATE_COLUMNS:
+            # Some exports store dates as text, others as Excel dates
+            series = pd.to_datetime(series, errors="coerce")
+
+        if pd.api.types.is_float_dtype(series):
+            # float32 halves memory; only used when it round-trips the exported precision
+            values = series.to_numpy(dtype=np.float64)
+            downcast = values.astype(np.float32)
+            if np.allclose(values, downcast, rtol=1e-6, atol=1e-9, equal_nan=True):
+                series = pd.Series(downcast, index=series.index, name=column)
+        elif pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            series = pd.to_numeric(series, downcast="integer")
+        elif column in IDENTITY_COLUMNS and series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * max(len(series), 1):
+            series = series.astype("category")
+
+        columns[column] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def ingest_workbook(job):
+    league, year, path = job
+    report = ValidationReport(league, year, path)
+    try:
+        df = read_workbook(path)
+    except Exception as exc:
+        report.error = str(exc)
+        return None, report
+
+    df.columns = [str(col).strip() for col in df.columns]
+    report.rows = len(df)
+
+    # Columns the derivation step creates are not expected in the export
+    derived_columns = {col.value for col in ToCreateColumns}
+    field_columns = [
+        col.value for col in ExistentFieldPlayerColumn if col.value not in derived_columns
+    ]
+    goalkeeper_columns = _goalkeeper_columns(df)
+    report.missing_field_columns = [col for col in field_columns if col not in df.columns]
+    report.missing_goalkeeper_columns = [col for col in ExistentGoalkeeperColumn.all_values() if col not in goalkeeper_columns]
+
+    numeric_columns = {col for col in field_columns if col in df.columns} | set(goalkeeper_columns.values())
+    df = coerce_dtypes(df, numeric_columns, report)
+
+    # Row-level league/season key for the consolidated store
+    df = df.assign(League=league, Year=year, **{SEASON_KEY: f"{league} {year}"})
+    return df, report
+
+
+def ingest_all(registry_path: str = "datasets.xlsx", output_path: str = STORE_PATH, workers: int = None):
+    from data_loader import DATASETS_DIR, read_datasets_registry
+
+    registry = read_datasets_registry(registry_path).dropna(subset=["LEAGUE", "YEAR", "PATH"])
+    jobs = [
+        (str(league).strip(), str(year).strip(), os.path.join(DATASETS_DIR, str(path).strip()))
+        for league, year, path in zip(registry["LEAGUE"], registry["YEAR"], registry["PATH"])
+    ]
+
+    # One workbook per process: warm-up scales with cores rather than with the number of files
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(ingest_workbook, jobs))
+
+    frames = [df for df, _ in results if df is not None]
+    reports = [report for _, report in results]
+    if not frames:
+        return None, reports
+
+    store = pd.concat(frames, ignore_index=True, sort=False)
+    # Categories differ per workbook and fall back to object on concat; re-encode on the union
+    for column in IDENTITY_COLUMNS + ["League", "Year", SEASON_KEY]:
+        if column in store.columns and store[column].nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(store):
+            store[column] = store[column].astype("category")
+    # Anything still holding mixed Python objects is stored as text
+    for column in store.columns[store.dtypes == object]:
+        store[column] = store[column].map(lambda value: value if pd.isna(value) else str(value))
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    store.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+    return store, reports
+
+
+def load_store(path: str = STORE_PATH, season_keys=None) -> pd.DataFrame:
+    # Only the requested seasons are read from disk
+    filters = [(SEASON_KEY, "in", list(season_keys))] if season_keys else None
+    return pd.read_parquet(path, filters=filters)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load every workbook in the registry into one validated multi-season store.")
+    parser.add_argument("--registry", default="datasets.xlsx")
+    parser.add_argument("--output", default=STORE_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    store, reports = ingest_all(args.registry, args.output, args.workers)
+    for report in reports:
+        print(report.summary())
+    if store is None:
+        raise SystemExit("No workbook could be ingested")
+    memory = store.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"Wrote {len(store)} rows from {len(reports)} workbooks to {args.output} "
+          f"({memory:.1f} MB in memory) in {time.perf_counter() - start:.1f}s")
+    if any(not report.ok for report in reports):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+# Structured timing records go to this logger, one JSON line per rerun
+TIMINGS_LOGGER = logging.getLogger("player_app.timings")
+# Optional file the JSON lines are appended to, for aggregation across users
+TIMINGS_LOG_ENV = "PLAYER_APP_TIMINGS_LOG"
+# Records every rerun, even when no session opened the debug panel
+PROFILE_ENV = "PLAYER_APP_PROFILE"
+
+
+class Span:
+    def __init__(self, name: str, depth: int, attrs: dict):
+        self.name = name
+        self.depth = depth
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def as_dict(self, origin: float) -> dict:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            **self.attrs,
+        }
+
+
+class RerunProfile:
+    def __init__(self, labels: dict):
+        self.labels = dict(labels)
+        self.start = time.perf_counter()
+        self.timestamp = time.time()
+        self.duration = None
+        self.spans = []
+        self._stack = []
+
+    def open(self, name: str, attrs: dict) -> Span:
+        span = Span(name, len(self._stack), attrs)
+        self.spans.append(span)
+        self._stack.append(span)
+        return span
+
+    def close(self, span: Span):
+        span.duration = time.perf_counter() - span.start
+        # Spans left open by an exception are closed with their parent
+        while self._stack and self._stack.pop() is not span:
+            pass
+
+    def annotate(self, attrs: dict):
+        if self._stack:
+            self._stack[-1].attrs.update(attrs)
+
+    def records(self) -> list[dict]:
+        return [span.as_dict(self.start) for span in self.spans]
+
+    def summary(self) -> dict:
+        # Total time, call count and cache outcomes per instrumented name
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(span.name, {"calls": 0, "total_ms": 0.0, "hits": 0, "misses": 0})
+            entry["calls"] += 1
+            entry["total_ms"] += (span.duration or 0.0) * 1000
+            if span.attrs.get("cache") == "hit":
+                entry["hits"] += 1
+            elif span.attrs.get("cache") == "miss":
+                entry["misses"] += 1
+        return totals
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "timestamp": self.timestamp,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            **self.labels,
+            "spans": self.records(),
+        }, default=str)
+
+
+class TimingRecorder:
+    # Collects spans for the rerun running on the current thread (Streamlit runs every
+    # session's script in its own thread). While no rerun is recorded, instrumented calls
+    # cost one thread-local lookup.
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def active(self) -> RerunProfile:
+        return getattr(self._local, "profile", None)
+
+    def start(self, **labels) -> RerunProfile:
+        profile = RerunProfile(labels)
+        self._local.profile = profile
+        return profile
+
+    def finish(self) -> RerunProfile:
+        profile = self.active
+        self._local.profile = None
+        if profile is not None:
+            profile.duration = time.perf_counter() - profile.start
+            if TIMINGS_LOGGER.isEnabledFor(logging.INFO):
+                TIMINGS_LOGGER.info(profile.to_json())
+        return profile
+
+
+RECORDER = TimingRecorder()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _RecordedSpan:
+    def __init__(self, profile: RerunProfile, name: str, attrs: dict):
+        self.profile = profile
+        self.name = name
+        self.attrs = attrs
+        self.span = None
+
+    def __enter__(self):
+        self.span = self.profile.open(self.name, self.attrs)
+        return self.span
+
+    def __exit__(self, *exc):
+        self.profile.close(self.span)
+        return False
+
+
+def span(name: str, **attrs):
+    profile = RECORDER.active
+    if profile is None:
+        return _NULL_SPAN
+    return _RecordedSpan(profile, name, attrs)
+
+
+def timed(name: str = None, cached: bool = False):
+    # Decorator version of `span`. Cached calls are counted as hits unless the cached
+    # body reports a miss through `annotate(cache="miss")`.
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profile = RECORDER.active
+            if profile is None:
+                return fn(*args, **kwargs)
+            current = profile.open(label, {"cache": "hit"} if cached else {})
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.close(current)
+
+        return wrapper
+
+    return decorator
+
+
+def annotate(**attrs):
+    # Adds attributes (row counts, cache outcome...) to the innermost open span
+    profile = RECORDER.active
+    if profile is not None:
+        profile.annotate(attrs)
+
+
+def profiling_forced() -> bool:
+    return os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes")
+
+
+def _configure_log_file():
+    path = os.environ.get(TIMINGS_LOG_ENV)
+    if not path:
+        return
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    TIMINGS_LOGGER.addHandler(handler)
+    TIMINGS_LOGGER.setLevel(logging.INFO)
+    TIMINGS_LOGGER.propagate = False
+
+
+_configure_log_file()
@@ -0,0 +1,210 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from enums import ExistentFieldPlayerColumn, Position, Stats
+from instrumentation import timed
+from normalization import NormalizationMode
+from similarity import position_group_codes
+
+
+def weights_for_role(role: Stats) -> dict:
+    # Equal weight for every metric of a role profile
+    return {stat: 1.0 for stat in role.value}
+
+
+class LeaderboardQuery:
+    def __init__(self, weights: dict, positions=None, min_minutes: float = None, max_minutes: float = None,
+                 min_age: float = None, max_age: float = None, teams=None, mode: str = NormalizationMode.MIN_MAX):
+        if not weights:
+            raise ValueError("A leaderboard query needs at least one weighted stat")
+        self.weights = dict(weights)
+        self.positions = list(positions) if positions else []
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self.min_age = min_age
+        self.max_age = max_age
+        self.teams = list(teams) if teams else []
+        self.mode = mode
+
+    @classmethod
+    def for_role(cls, role: Stats, **filters):
+        filters.setdefault("positions", role.positions)
+        return cls(weights_for_role(role), **filters)
+
+
+class LeaderboardPage:
+    def __init__(self, rows: pd.DataFrame, total: int, page: int, page_size: int):
+        self.rows = rows
+        self.total = total
+        self.page = page
+        self.page_size = page_size
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+    @property
+    def has_next(self) -> bool:
+        return self.page + 1 < self.page_count
+
+
+class Leaderboard:
+    # Ranks players of one or many processed league-seasons. Every column is turned into one
+    # flat array across all datasets on first use and cached, so queries are pure NumPy. With a
+    # pipeline.PopulationFilter, only the players it keeps are ranked and scaling bounds come from them.
+    def __init__(self, datasets, population_filter=None):
+        self.datasets = list(datasets)
+        self.population_filter = population_filter if population_filter else None
+        self.size = sum(len(dataset) for dataset in self.datasets)
+        self.dataset_ids = np.repeat(np.arange(len(self.datasets)), [len(dataset) for dataset in self.datasets])
+        self.rows = np.concatenate([np.arange(len(dataset)) for dataset in self.datasets]) if self.datasets else np.empty(0, dtype=int)
+        self._raw = {}
+        self._normalized = {}
+        self._labels = {}
+        self._position_groups = None
+        self._population = None
+        self._lock = threading.Lock()
+
+    def raw(self, column: str) -> np.ndarray:
+        with self._lock:
+            if column not in self._raw:
+                parts = [
+                    dataset.players_df[column].to_numpy(dtype=float) if column in dataset.players_df.columns
+                    else np.full(len(dataset), np.nan)
+                    for dataset in self.datasets
+                ]
+                self._raw[column] = np.concatenate(parts) if parts else np.empty(0)
+            return self._raw[column]
+
+    def normalized(self, column: str, mode: str) -> np.ndarray:
+        # Scaled within each league-season, so scores are comparable across leagues
+        key = (column, mode)
+        with self._lock:
+            cached = self._normalized.get(key)
+        if cached is not None:
+            return cached
+
+        parts = []
+        for dataset in self.datasets:
+            if column in dataset.players_df.columns:
+                values = dataset.players_df[column].to_numpy(dtype=float)
+                parts.append(dataset.baseline(self.population_filter).normalize(values[:, None], [column], mode)[:, 0])
+            else:
+                parts.append(np.full(len(dataset), np.nan))
+        normalized = np.concatenate(parts) if parts else np.empty(0)
+
+        with self._lock:
+            self._normalized[key] = normalized
+        return normalized
+
+    def labels(self, column: str) -> np.ndarray:
+        with self._lock:
+            if column not in self._labels:
+                parts = [
+                    dataset.players_df[column].to_numpy(dtype=object) if column in dataset.players_df.columns
+                    else np.full(len(dataset), None, dtype=object)
+                    for dataset in self.datasets
+                ]
+                self._labels[column] = np.concatenate(parts) if parts else np.empty(0, dtype=object)
+            return self._labels[column]
+
+    def position_groups(self) -> np.ndarray:
+        if self._position_groups is None:
+            self._position_groups = position_group_codes(self.labels("Primary position"))
+        return self._position_groups
+
+    def population(self) -> np.ndarray:
+        # Players the population filter keeps, all of them without one
+        if self._population is None:
+            if self.population_filter is None:
+                self._population = np.ones(self.size, dtype=bool)
+            else:
+                masks = [self.population_filter.mask(dataset) for dataset in self.datasets]
+                self._population = np.concatenate(masks) if masks else np.empty(0, dtype=bool)
+        return self._population
+
+    def mask(self, query: LeaderboardQuery) -> np.ndarray:
+        mask = self.population().copy()
+
+        minutes = self.raw(ExistentFieldPlayerColumn.MINUTES_PLAYED.value)
+        # "More than", like PopulationFilter and the load-time threshold
+        if query.min_minutes is not None:
+            mask &= minutes > query.min_minutes
+        if query.max_minutes is not None:
+            mask &= minutes <= query.max_minutes
+
+        age = self.raw("Age")
+        if query.min_age is not None:
+            mask &= age >= query.min_age
+        if query.max_age is not None:
+            mask &= age <= query.max_age
+
+        if query.positions:
+            members = list(Position)
+            wanted = [members.index(position) for position in query.positions]
+            mask &= np.isin(self.position_groups(), wanted)
+
+        if query.teams:
+            mask &= np.isin(self.labels("Team"), query.teams)
+
+        return mask
+
+    def scores(self, query: LeaderboardQuery) -> np.ndarray:
+        total_weight = sum(abs(weight) for weight in query.weights.values())
+        scores = np.zeros(self.size)
+        for column, weight in query.weights.items():
+            scores += weight * np.nan_to_num(self.normalized(column, query.mode), nan=0.0)
+        return scores / total_weight if total_weight else scores
+
+    @timed("Leaderboard.query")
+    def query(self, query: LeaderboardQuery, page: int = 0, page_size: int = 20) -> LeaderboardPage:
+        if page < 0 or page_size <= 0:
+            raise ValueError("page must be >= 0 and page_size > 0")
+
+        candidates = np.flatnonzero(self.mask(query))
+        scores = self.scores(query)[candidates]
+        total = len(candidates)
+
+        # Only the first (page + 1) * page_size entries are ever sorted
+        needed = min((page + 1) * page_size, total)
+        if needed == 0:
+            return LeaderboardPage(self._rows_frame(np.empty(0, dtype=int), np.empty(0), query), total, page, page_size)
+        if needed < total:
+            top = np.argpartition(-scores, needed - 1)[:needed]
+        else:
+            top = np.arange(total)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        selected = top[page * page_size:needed]
+
+        rows = self._rows_frame(candidates[selected], scores[selected], query, rank_offset=page * page_size)
+        return LeaderboardPage(rows, total, page, page_size)
+
+    def _rows_frame(self, ids: np.ndarray, scores: np.ndarray, query: LeaderboardQuery, rank_offset: int = 0) -> pd.DataFrame:
+        records = []
+        teams = self.labels("Team")
+        positions = self.labels("Primary position")
+        minutes = self.raw(ExistentFieldPlayerColumn.MINUTES_PLAYED.value)
+        age = self.raw("Age")
+        stat_values = {column: self.raw(column) for column in query.weights}
+
+        for rank, (player_id, score) in enumerate(zip(ids, scores), start=rank_offset + 1):
+            dataset = self.datasets[self.dataset_ids[player_id]]
+            row = int(self.rows[player_id])
+            record = {
+                "Rank": rank,
+                "Player": dataset.player_index.label_for_row(row),
+                "Team": teams[player_id],
+                "Primary position": positions[player_id],
+                "League": dataset.league,
+                "Year": dataset.year,
+                "Age": age[player_id],
+                "Minutes played": minutes[player_id],
+                "Score": float(score),
+            }
+            record.update({column: values[player_id] for column, values in stat_values.items()})
+            records.append(record)
+
+        columns = ["Rank", "Player", "Team", "Primary position", "League", "Year", "Age", "Minutes played", "Score"]
+        return pd.DataFrame(records, columns=columns + list(query.weights))
@@ -0,0 +1,160 @@
+from collections import OrderedDict
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import annotate, timed
+
+
+class NormalizationMode:
+    MIN_MAX = "min_max"
+    PERCENTILE = "percentile"
+
+    ALL = (MIN_MAX, PERCENTILE)
+
+
+class NormalizationIndex:
+    def __init__(self, players_df: pd.DataFrame, columns: list[str] = None):
+        if columns is None:
+            columns = players_df.select_dtypes(include='number').columns.tolist()
+
+        columns = list(columns)
+        values = players_df[columns].to_numpy(dtype=float) if columns else np.empty((len(players_df), 0))
+        self._build(values, columns)
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, columns: list[str]) -> "NormalizationIndex":
+        # For populations assembled from several frames or masks without building a DataFrame
+        index = cls.__new__(cls)
+        index._build(np.asarray(values, dtype=float).reshape(-1, len(columns)), list(columns))
+        return index
+
+    def _build(self, values: np.ndarray, columns: list[str]):
+        self.columns = columns
+        self.positions = {col: i for i, col in enumerate(self.columns)}
+        self.size = len(values)
+
+        # Bounds and sorted values are computed once for the whole population.
+        # All-NaN columns simply get NaN bounds, so silence numpy's warning about them
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            self.min = np.nanmin(values, axis=0) if len(values) else np.full(len(self.columns), np.nan)
+            self.max = np.nanmax(values, axis=0) if len(values) else np.full(len(self.columns), np.nan)
+        self.range = self.max - self.min
+
+        # np.sort puts NaN last, so the first `counts[i]` entries of each column are the valid values
+        self.sorted_values = np.sort(values, axis=0)
+        self.counts = np.count_nonzero(~np.isnan(values), axis=0)
+
+    def __contains__(self, column_name):
+        return column_name in self.positions
+
+    def normalize(self, values, columns: list[str], mode: str = NormalizationMode.MIN_MAX) -> np.ndarray:
+        # values: players × stats array (or a single row) aligned with `columns`
+        if mode not in NormalizationMode.ALL:
+            raise ValueError(f"Unknown normalization mode '{mode}'")
+
+        values = np.asarray(values, dtype=float)
+        single_row = values.ndim == 1
+        values = np.atleast_2d(values)
+
+        positions = np.array([self.positions.get(col, -1) for col in columns], dtype=int)
+        known = positions >= 0
+        result = np.full(values.shape, np.nan)
+
+        if mode == NormalizationMode.MIN_MAX:
+            cols = positions[known]
+            min_val = self.min[cols]
+            value_range = self.range[cols]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                scaled = (values[:, known] - min_val) / value_range
+            # A constant column carries no information, keep the previous convention of 0
+            scaled[:, value_range == 0] = 0
+            result[:, known] = scaled
+        else:
+            for out_col, col in zip(np.flatnonzero(known), positions[known]):
+                count = self.counts[col]
+                if count == 0:
+                    continue
+                column_values = values[:, out_col]
+                ranks = np.searchsorted(self.sorted_values[:count, col], column_values, side='right') / count
+                result[:, out_col] = np.where(np.isnan(column_values), np.nan, ranks)
+
+        return result[0] if single_row else result
+
+    def normalize_column(self, column_name: str, values, mode: str = NormalizationMode.MIN_MAX):
+        if column_name not in self.positions:
+            raise KeyError(f"Column '{column_name}' not found in DataFrame columns")
+
+        col = self.positions[column_name]
+        if mode == NormalizationMode.MIN_MAX:
+            if self.range[col] == 0:
+                return 0
+            return (values - self.min[col]) / self.range[col]
+
+        normalized = self.normalize(np.reshape(np.asarray(values, dtype=float), (-1, 1)), [column_name], mode)[:, 0]
+        if isinstance(values, pd.Series):
+            return pd.Series(normalized, index=values.index, name=values.name)
+        return normalized if np.ndim(values) else normalized[0]
+
+    @timed("NormalizationIndex.normalize_player")
+    def normalize_player(self, player_row: pd.Series, columns: list[str], mode: str = NormalizationMode.MIN_MAX) -> pd.Series:
+        present = [col in player_row.index for col in columns]
+        values = np.array(
+            [_to_float(player_row[col]) if is_present else np.nan for col, is_present in zip(columns, present)]
+        )
+        normalized = self.normalize(values, columns, mode)
+        # Columns missing from the player row stay NaN
+        normalized[~np.array(present, dtype=bool)] = np.nan
+        return pd.Series(normalized, index=columns)
+
+    def normalize_players(self, players_df: pd.DataFrame, columns: list[str], mode: str = NormalizationMode.MIN_MAX) -> pd.DataFrame:
+        present = [col for col in columns if col in players_df.columns]
+        values = np.full((len(players_df), len(columns)), np.nan)
+        if present:
+            indices = [columns.index(col) for col in present]
+            values[:, indices] = players_df[present].to_numpy(dtype=float)
+        return pd.DataFrame(self.normalize(values, columns, mode), index=players_df.index, columns=columns)
+
+
+class NormalizationIndexCache:
+    # Bounded cache of indexes per population (league-season, combined pair, position group...)
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @timed("NormalizationIndexCache.get_or_build", cached=True)
+    def get_or_build(self, key, build) -> NormalizationIndex:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        index = build()
+        annotate(cache="miss", rows=index.size)
+
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Populations (pipeline.Population) build and look up their indexes here
+NORMALIZATION_INDEXES = NormalizationIndexCache()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
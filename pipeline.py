@@ -0,0 +1,517 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from compact_table import CompactPlayerTable, frame_memory
+from data_loader import DatasetLoader, load_player_data
+from enums import ExistentFieldPlayerColumn, Position
+from instrumentation import annotate, span, timed
+from dataset_cache import get_workbook_version
+from normalization import NORMALIZATION_INDEXES, NormalizationIndex, NormalizationMode
+from leaderboard import Leaderboard
+from rolefit import RoleFitMatrix
+from player_index import DatasetPlayerIndex, PlayerIndex
+from similarity import SimilarityIndex, position_group_codes
+from shared_store import SharedStore, shared_name
+from workbook_reader import PROJECTION_VERSION, READ_ERROR_ATTR, is_complete
+from stats_processor import DERIVED_COLUMNS, GOALKEEPER_DERIVED_COLUMNS, DerivedColumnEngine, GoalkeeperStatsProcessor, StatsProcessor
+from trajectory import TrajectoryIndex
+
+# Default minimum minutes of the app and service populations, the threshold the datasets used to be loaded with
+DEFAULT_MIN_MINUTES = 600
+
+# Structures built per population filter are kept for the most recently used ones only, since
+# every slider position is a new filter
+FILTERED_CACHE_ENTRIES = 32
+
+
+class ProcessedDataset:
+    # One league-season after derivation and tagging. The frame is shared between
+    # reruns and sessions, so it must be treated as read-only.
+    def __init__(self, league: str, year: str, players_df: pd.DataFrame, key: tuple, table: CompactPlayerTable = None,
+                 source_rows: np.ndarray = None, scope: tuple = None, complete: bool = True):
+        self.league = league
+        self.year = year
+        self.key = key
+        # False when the workbook broke off midway and only its first rows were read
+        self.complete = complete
+        # The key without its versions: artifacts of one scope replace each other on disk
+        self.scope = scope if scope is not None else (league, year)
+        # Subsets (e.g. goalkeepers only) keep the row positions they had in the full league-season
+        self.source_rows = source_rows
+        # In compact mode the frame is a view over the table's float32 stats block
+        self.table = table
+        self._players_df = table.frame if table is not None else players_df
+        self._numeric_columns = None
+        self._player_index = None
+        self._position_baselines = OrderedDict()
+        self._baselines_lock = threading.Lock()
+        self._arrays = {}
+        self._position_groups = None
+        self._nbytes = None
+
+    @property
+    def players_df(self) -> pd.DataFrame:
+        return self._players_df
+
+    @property
+    def numeric_columns(self) -> list[str]:
+        if self._numeric_columns is None:
+            self._numeric_columns = self._players_df.select_dtypes(include='number').columns.tolist()
+        return list(self._numeric_columns)
+
+    @property
+    def normalization_index(self) -> NormalizationIndex:
+        return Population([self]).normalization_index
+
+    def position_baselines(self, population_filter: "PopulationFilter" = None) -> dict:
+        # Normalization index per Position group, all built from a single pass over the stats, over
+        # the players a PopulationFilter keeps (its own positions aside) and kept per filter.
+        # Raw codes ("LCB3", "RAMF"...) are grouped through the Position enum lists.
+        population_filter = population_filter.restricted(()) if population_filter else None
+        key = _filter_key(population_filter)
+        with self._baselines_lock:
+            baselines = self._position_baselines.get(key)
+            if baselines is None:
+                columns = self.numeric_columns
+                values = self.values(columns)
+                groups = self.position_groups
+                if population_filter is not None:
+                    mask = population_filter.mask(self)
+                    values, groups = values[mask], groups[mask]
+                baselines = {
+                    position: NormalizationIndex.from_values(values[groups == group], columns)
+                    for group, position in enumerate(Position)
+                }
+            return _remember(self._position_baselines, key, baselines)
+
+    def baseline(self, population_filter: "PopulationFilter" = None) -> NormalizationIndex:
+        # Bounds over the players a PopulationFilter keeps; every player is still processed and scored
+        return Population([self], population_filter=population_filter).normalization_index
+
+    def position_baseline(self, position: Position, population_filter: "PopulationFilter" = None) -> NormalizationIndex:
+        return self.position_baselines(population_filter)[position]
+
+    @property
+    def player_index(self) -> DatasetPlayerIndex:
+        if self._player_index is None:
+            self._player_index = DatasetPlayerIndex(self)
+        return self._player_index
+
+    def values(self, columns: list[str], rows=None) -> np.ndarray:
+        # Rows × columns stat block (all rows, or the given row positions); read straight
+        # from the compact block when possible
+        if self.table is not None and all(col in self.table.stat_index for col in columns):
+            return self.table.block(columns, rows)
+        frame = self._players_df if rows is None else self._players_df.iloc[list(rows)]
+        return frame[columns].to_numpy(dtype=float)
+
+    def array(self, column: str) -> np.ndarray:
+        # Float copy of one column, built once for the cheap runtime filters
+        if column not in self._arrays:
+            if column in self._players_df.columns:
+                self._arrays[column] = self._players_df[column].to_numpy(dtype=float)
+            else:
+                self._arrays[column] = np.full(len(self), np.nan)
+        return self._arrays[column]
+
+    @property
+    def position_groups(self) -> np.ndarray:
+        if self._position_groups is None:
+            self._position_groups = position_group_codes(self._players_df["Primary position"].tolist())
+        return self._position_groups
+
+    def row_for_source(self, row: int) -> int:
+        # Row of a subset matching a row of the full league-season
+        position = int(np.searchsorted(self.source_rows, row))
+        if position == len(self.source_rows) or self.source_rows[position] != row:
+            raise KeyError(f"Row {row} is not part of this subset of {self.league} {self.year}")
+        return position
+
+    @property
+    def nbytes(self) -> int:
+        if self._nbytes is None:
+            self._nbytes = self.table.nbytes if self.table is not None else frame_memory(self._players_df)
+        return self._nbytes
+
+    def mask(self, column: str, values) -> np.ndarray:
+        return self._players_df[column].isin(list(values)).to_numpy()
+
+    def __len__(self):
+        return len(self._players_df)
+
+    def __repr__(self):
+        return f"ProcessedDataset(league={self.league!r}, year={self.year!r}, rows={len(self)})"
+
+
+class PopulationFilter:
+    # Cheap row filters applied at runtime instead of at load time: minutes and age ranges,
+    # teams and Position groups. Datasets are processed once unfiltered; a filter is a boolean
+    # mask over cached column arrays, so changing a threshold never reloads anything.
+    def __init__(self, min_minutes: float = None, max_minutes: float = None, min_age: float = None, max_age: float = None,
+                 teams=None, positions=None):
+        self.min_minutes = min_minutes
+        self.max_minutes = max_minutes
+        self.min_age = min_age
+        self.max_age = max_age
+        self.teams = tuple(sorted(teams)) if teams else ()
+        self.positions = tuple(positions) if positions else ()
+
+    @property
+    def key(self) -> tuple:
+        return (self.min_minutes, self.max_minutes, self.min_age, self.max_age, self.teams,
+                tuple(position.name for position in self.positions))
+
+    def __bool__(self):
+        return any(value not in (None, ()) for value in self.key)
+
+    def restricted(self, positions) -> "PopulationFilter":
+        # Same thresholds and teams over other Position groups
+        return PopulationFilter(self.min_minutes, self.max_minutes, self.min_age, self.max_age, self.teams, positions)
+
+    def mask(self, dataset: ProcessedDataset) -> np.ndarray:
+        mask = np.ones(len(dataset), dtype=bool)
+        minutes = dataset.array(ExistentFieldPlayerColumn.MINUTES_PLAYED.value)
+        # Same "more than" convention as the load-time threshold
+        if self.min_minutes is not None:
+            mask &= minutes > self.min_minutes
+        if self.max_minutes is not None:
+            mask &= minutes <= self.max_minutes
+
+        age = dataset.array("Age")
+        if self.min_age is not None:
+            mask &= age >= self.min_age
+        if self.max_age is not None:
+            mask &= age <= self.max_age
+
+        if self.teams:
+            mask &= dataset.mask("Team", self.teams)
+        if self.positions:
+            members = list(Position)
+            mask &= np.isin(dataset.position_groups, [members.index(position) for position in self.positions])
+        return mask
+
+
+class Population:
+    # A normalization population: one or more processed datasets, optionally narrowed by
+    # column filters such as (("Primary position", ("CB", "LCB")),) and a PopulationFilter.
+    # Rows are selected through boolean masks, the cached frames are never concatenated or copied.
+    def __init__(self, datasets, filters=(), population_filter: PopulationFilter = None):
+        unique = {}
+        for dataset in datasets:
+            unique.setdefault(dataset.key, dataset)
+        self.datasets = tuple(unique.values())
+        self.filters = tuple((column, tuple(values)) for column, values in filters)
+        self.population_filter = population_filter if population_filter else None
+
+    @property
+    def key(self) -> tuple:
+        filter_key = self.population_filter.key if self.population_filter is not None else None
+        return tuple(dataset.key for dataset in self.datasets), self.filters, filter_key
+
+    def position_baseline(self, position: Position) -> NormalizationIndex:
+        # Same population restricted to one Position group; a single league-season reads it from
+        # the baselines precomputed for every group
+        if not self.filters and len(self.datasets) == 1:
+            return self.datasets[0].position_baseline(position, self.population_filter)
+        restricted = (self.population_filter or PopulationFilter()).restricted([position])
+        return Population(self.datasets, self.filters, restricted).normalization_index
+
+    @property
+    def numeric_columns(self) -> list[str]:
+        # Columns shared by every dataset, in the order of the first one
+        columns = self.datasets[0].numeric_columns
+        for dataset in self.datasets[1:]:
+            shared = set(dataset.numeric_columns)
+            columns = [col for col in columns if col in shared]
+        return columns
+
+    def masks(self) -> list:
+        masks = []
+        for dataset in self.datasets:
+            mask = self.population_filter.mask(dataset) if self.population_filter is not None else None
+            for column, values in self.filters:
+                column_mask = dataset.mask(column, values)
+                mask = column_mask if mask is None else mask & column_mask
+            masks.append(mask)
+        return masks
+
+    def values(self, columns: list[str]) -> np.ndarray:
+        blocks = []
+        for dataset, mask in zip(self.datasets, self.masks()):
+            block = dataset.values(columns)
+            blocks.append(block if mask is None else block[mask])
+        return np.vstack(blocks) if blocks else np.empty((0, len(columns)))
+
+    def member_values(self, members, columns: list[str]) -> np.ndarray:
+        # members: (dataset, row) pairs, e.g. a shortlist across leagues and seasons. Rows are
+        # gathered per dataset; stats a dataset does not have stay NaN.
+        values = np.full((len(members), len(columns)), np.nan)
+        by_dataset = {}
+        for position, (dataset, row) in enumerate(members):
+            by_dataset.setdefault(dataset.key, (dataset, [], []))
+            by_dataset[dataset.key][1].append(position)
+            by_dataset[dataset.key][2].append(row)
+
+        for dataset, positions, rows in by_dataset.values():
+            available = set(dataset.numeric_columns)
+            present = [i for i, col in enumerate(columns) if col in available]
+            if present:
+                values[np.ix_(positions, present)] = dataset.values([columns[i] for i in present], rows)
+        return values
+
+    def normalize_members(self, members, columns: list[str], mode: str = NormalizationMode.MIN_MAX) -> np.ndarray:
+        # Bounds come from the whole population once; every member is scaled in one call
+        return self.normalization_index.normalize(self.member_values(members, columns), columns, mode)
+
+    def __len__(self):
+        return sum(len(dataset) if mask is None else int(mask.sum()) for dataset, mask in zip(self.datasets, self.masks()))
+
+    @property
+    def normalization_index(self) -> NormalizationIndex:
+        columns = self.numeric_columns
+        return NORMALIZATION_INDEXES.get_or_build(
+            self.key, lambda: NormalizationIndex.from_values(self.values(columns), columns)
+        )
+
+
+def _filter_key(population_filter: PopulationFilter = None):
+    return population_filter.key if population_filter else None
+
+
+def _remember(cache: OrderedDict, key, value):
+    # Least recently used entries are dropped first; callers hold the lock
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > FILTERED_CACHE_ENTRIES:
+        cache.popitem(last=False)
+    return value
+
+
+class ProcessingPipeline:
+    def __init__(self, dataset_loader: DatasetLoader = None, engine: DerivedColumnEngine = None, min_minutes: int = 600,
+                 compact: bool = False, read_players=None, store: SharedStore = None):
+        self.dataset_loader = dataset_loader or DatasetLoader()
+        # Streamlit-cached by default; headless callers pass data_loader.read_player_data
+        self.read_players = read_players or load_player_data
+        self.engine = engine or DERIVED_COLUMNS
+        self.min_minutes = min_minutes
+        # Compact mode stores float32 stat blocks and categorical text, see CompactPlayerTable
+        self.compact = compact
+        # Compact tables in a shared store are processed once per host and memory-mapped by every process
+        self.store = store
+        self._datasets = {}
+        self._cross_season = OrderedDict()
+        self._leaderboards = OrderedDict()
+        self._trajectories = OrderedDict()
+        self._role_fits = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def dataset_scope(self, league: str, year: str) -> tuple:
+        # League-season and processing options; pipelines with other options keep their own copies
+        return (league.strip(), str(year).strip(), self.min_minutes, self.compact)
+
+    def dataset_key(self, league: str, year: str) -> tuple:
+        # The workbook version makes edited workbooks (and artifacts derived from them) reprocess
+        path = self.dataset_loader.get_dataset_path(league, year)
+        return (league.strip(), str(year).strip(), get_workbook_version(path), PROJECTION_VERSION, self.engine.schema_version,
+                self.min_minutes, self.compact)
+
+    @timed("ProcessingPipeline.get", cached=True)
+    def get(self, league: str, year: str, on_progress=None) -> ProcessedDataset:
+        # on_progress receives the workbook_reader.ReadProgress of a workbook streamed for this call
+        key = self.dataset_key(league, year)
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is not None:
+                return dataset
+            # One build per key: a foreground call waits for a background prefetch of the same season
+            building = self._building.setdefault(key, threading.Lock())
+
+        with building:
+            with self._lock:
+                dataset = self._datasets.get(key)
+            if dataset is None:
+                dataset = self._process(league, year, key, on_progress)
+                if dataset.complete:
+                    with self._lock:
+                        dataset = self._datasets.setdefault(key, dataset)
+        with self._lock:
+            self._building.pop(key, None)
+        return dataset
+
+    def is_processed(self, league: str, year: str) -> bool:
+        key = self.dataset_key(league, year)
+        with self._lock:
+            return key in self._datasets
+
+    def memory_usage(self) -> int:
+        # Bytes held by processed datasets; memory-mapped tables count although the page cache shares them
+        with self._lock:
+            datasets = list(self._datasets.values())
+        return sum(dataset.nbytes for dataset in datasets)
+
+    def _process(self, league: str, year: str, key: tuple, on_progress=None) -> ProcessedDataset:
+        if self.compact and self.store is not None:
+            name = shared_name("table", self.dataset_scope(league, year), key)
+            read_errors = []
+
+            def build():
+                players_df = self._derive(league, year, on_progress)
+                if not is_complete(players_df):
+                    read_errors.append(players_df.attrs[READ_ERROR_ATTR])
+                return CompactPlayerTable.from_frame(players_df)
+
+            table = self.store.table(name, build, cacheable=lambda table: not read_errors)
+            annotate(cache="miss", rows=len(table))
+            return self._dataset(league, year, None, key, table, complete=not read_errors)
+
+        players_df = self._derive(league, year, on_progress)
+        annotate(cache="miss", rows=len(players_df))
+        if self.compact:
+            return self._dataset(league, year, None, key, CompactPlayerTable.from_frame(players_df), is_complete(players_df))
+        return self._dataset(league, year, players_df, key, None, is_complete(players_df))
+
+    def _dataset(self, league: str, year: str, players_df, key: tuple, table, complete: bool) -> ProcessedDataset:
+        # Rows of a workbook that broke off midway get their own key, so nothing cached from them
+        # (artifacts, indexes) is ever taken for the full league-season
+        if not complete:
+            key = key + ("incomplete",)
+        return ProcessedDataset(league, year, players_df, key, table, scope=self.dataset_scope(league, year), complete=complete)
+
+    def _derive(self, league: str, year: str, on_progress=None) -> pd.DataFrame:
+        path = self.dataset_loader.get_dataset_path(league, year)
+        with span("load_player_data", cache="hit"):
+            players_df = self.read_players(path, self.min_minutes, on_progress)
+        stats_processor = StatsProcessor(players_df, self.engine)
+        stats_processor.create_columns()
+
+        # Tagging columns are added once here instead of on every rerun
+        derived = stats_processor.players_df.assign(
+            Year=year,
+            League=league,
+            name_year=stats_processor.players_df["Full name"] + f" ({year})",
+        )
+        if not is_complete(players_df):
+            derived.attrs[READ_ERROR_ATTR] = players_df.attrs[READ_ERROR_ATTR]
+        return derived
+
+    @timed("ProcessingPipeline.goalkeepers", cached=True)
+    def goalkeepers(self, dataset: ProcessedDataset) -> ProcessedDataset:
+        # Keepers of a processed league-season with keeper metrics only, derived once per dataset
+        key = dataset.key + ("goalkeepers", GOALKEEPER_DERIVED_COLUMNS.schema_version)
+        with self._lock:
+            goalkeepers = self._datasets.get(key)
+        if goalkeepers is not None:
+            return goalkeepers
+
+        scope = dataset.scope + ("goalkeepers",)
+        processor = GoalkeeperStatsProcessor(dataset.players_df)
+        processor.create_columns()
+        annotate(cache="miss", rows=len(processor.rows))
+        if self.compact:
+            table = CompactPlayerTable.from_frame(processor.players_df)
+            goalkeepers = ProcessedDataset(dataset.league, dataset.year, None, key, table,
+                                           source_rows=processor.rows, scope=scope)
+        else:
+            goalkeepers = ProcessedDataset(dataset.league, dataset.year, processor.players_df, key,
+                                           source_rows=processor.rows, scope=scope)
+
+        with self._lock:
+            return self._datasets.setdefault(key, goalkeepers)
+
+    def goalkeeper_member(self, dataset: ProcessedDataset, row: int):
+        # (keeper dataset, row) for a player of a full league-season, ValueError for outfield players
+        goalkeepers = self.goalkeepers(dataset)
+        try:
+            return goalkeepers, goalkeepers.row_for_source(row)
+        except KeyError:
+            label = dataset.player_index.label_for_row(row)
+            raise ValueError(f"{label} is not a goalkeeper in {dataset.league} {dataset.year}") from None
+
+    def get_all(self) -> list[ProcessedDataset]:
+        return [self.get(league, year) for league, year in self.dataset_loader.get_registered_datasets()]
+
+    def _over_all_datasets(self, name, build):
+        # Structures spanning every workbook in the registry, rebuilt only when the set of datasets changes.
+        # The build runs outside the pipeline lock, so get() and the prefetch workers are not held up by it.
+        datasets = self.get_all()
+        keys = tuple(dataset.key for dataset in datasets)
+        with self._lock:
+            cached = self._cross_season.get(name)
+            if cached is not None and cached[0] == keys:
+                return _remember(self._cross_season, name, cached)[1]
+            building = self._building.setdefault((name, keys), threading.Lock())
+
+        with building:
+            with self._lock:
+                cached = self._cross_season.get(name)
+            if cached is None or cached[0] != keys:
+                cached = (keys, build(datasets))
+            with self._lock:
+                structure = _remember(self._cross_season, name, cached)[1]
+        with self._lock:
+            self._building.pop((name, keys), None)
+        return structure
+
+    def player_index(self) -> PlayerIndex:
+        # Seasons go through get(), which keeps them per workbook version
+        return PlayerIndex(self.dataset_loader.get_registered_datasets(), self.get)
+
+    def similarity_index(self) -> SimilarityIndex:
+        # One index whatever the population filter, pass the filter to SimilarityIndex.query
+        return self._over_all_datasets("similarity_index", SimilarityIndex)
+
+    def trajectory_index(self, population_filter: PopulationFilter = None) -> TrajectoryIndex:
+        # Seasons already joined are kept, only newly registered or edited workbooks are processed
+        population_filter = population_filter if population_filter else None
+        key = _filter_key(population_filter)
+        with self._lock:
+            trajectories = self._trajectories.get(key)
+            if trajectories is None:
+                trajectories = TrajectoryIndex(population_filter=population_filter)
+            _remember(self._trajectories, key, trajectories)
+        trajectories.update(self.get_all())
+        return trajectories
+
+    @timed("ProcessingPipeline.role_fit", cached=True)
+    def role_fit(self, dataset: ProcessedDataset, mode: str = NormalizationMode.MIN_MAX,
+                 population_filter: PopulationFilter = None) -> RoleFitMatrix:
+        # Keyed by dataset version, so a changed workbook only rescores its own league-season
+        population_filter = population_filter if population_filter else None
+        key = (dataset.key, mode, _filter_key(population_filter))
+        with self._lock:
+            role_fit = self._role_fits.get(key)
+            if role_fit is not None:
+                return _remember(self._role_fits, key, role_fit)
+
+        annotate(cache="miss")
+        role_fit = RoleFitMatrix(dataset, mode=mode, population_filter=population_filter)
+        with self._lock:
+            return _remember(self._role_fits, key, self._role_fits.get(key, role_fit))
+
+    def leaderboard(self, datasets=None, population_filter: PopulationFilter = None) -> Leaderboard:
+        # Column arrays are cached inside the leaderboard, so keep one per set of datasets and filter
+        datasets = self.get_all() if datasets is None else list(datasets)
+        population_filter = population_filter if population_filter else None
+        key = (tuple(dataset.key for dataset in datasets), _filter_key(population_filter))
+        with self._lock:
+            leaderboard = self._leaderboards.get(key)
+            if leaderboard is None:
+                leaderboard = Leaderboard(datasets, population_filter)
+            return _remember(self._leaderboards, key, leaderboard)
+
+    def population(self, datasets, filters=(), population_filter: PopulationFilter = None) -> Population:
+        return Population(datasets, filters, population_filter)
+
+    def invalidate(self):
+        with self._lock:
+            self._datasets.clear()
+            self._cross_season.clear()
+            self._leaderboards.clear()
+            self._trajectories.clear()
+            self._role_fits.clear()
+        NORMALIZATION_INDEXES.clear()
@@ -0,0 +1,137 @@
+import unicodedata
+from typing import NamedTuple
+
+import pandas as pd
+
+
+def normalize_name(name) -> str:
+    # "Ştefan  Târnovanu" and "stefan tarnovanu" map to the same key
+    if not isinstance(name, str):
+        return ""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def check_distinct(*players):
+    if len(set(players)) != len(players):
+        raise ValueError("Please select two different players to compare.")
+
+
+def sorted_unique_names(names) -> list[str]:
+    unique = {name for name in names if isinstance(name, str)}
+    return sorted(unique, key=lambda name: (normalize_name(name), name))
+
+
+class PlayerMatch(NamedTuple):
+    dataset: object  # pipeline.ProcessedDataset
+    row: int
+
+    @property
+    def data(self) -> pd.Series:
+        return self.dataset.players_df.iloc[self.row]
+
+    @property
+    def label(self) -> str:
+        return self.dataset.player_index.label_for_row(self.row)
+
+
+class DatasetPlayerIndex:
+    # Row positions of one processed league-season, keyed by (normalized full name, team)
+    def __init__(self, dataset):
+        self.dataset = dataset
+        players_df = dataset.players_df
+
+        full_names = players_df["Full name"] if "Full name" in players_df.columns else players_df["Player"]
+        short_names = players_df["Player"] if "Player" in players_df.columns else full_names
+        teams = players_df["Team"] if "Team" in players_df.columns else pd.Series([""] * len(players_df))
+
+        names = [
+            full if isinstance(full, str) and full.strip() else str(short)
+            for full, short in zip(full_names.tolist(), short_names.tolist())
+        ]
+        teams = [team if isinstance(team, str) else "" for team in teams.tolist()]
+
+        self._rows = {}
+        self._name_rows = {}
+        for row, (name, team) in enumerate(zip(names, teams)):
+            self._rows.setdefault((normalize_name(name), team), []).append(row)
+            self._name_rows.setdefault(normalize_name(name), []).append(row)
+
+        self.labels, self._label_rows, self._row_labels = self._build_labels(names, teams, self._name_rows)
+
+    @staticmethod
+    def _build_labels(names, teams, rows_by_name):
+        # Unique names are shown as is; homonyms get their team and, if still ambiguous, a counter
+        label_rows = {}
+        row_labels = {}
+        for rows in rows_by_name.values():
+            for count, row in enumerate(rows, start=1):
+                if len(rows) == 1:
+                    label = names[row]
+                elif sum(teams[other] == teams[row] for other in rows) == 1:
+                    label = f"{names[row]} ({teams[row]})"
+                else:
+                    label = f"{names[row]} ({teams[row]}, {count})"
+                label_rows[label] = row
+                row_labels[row] = label
+
+        labels = sorted(label_rows, key=lambda label: (normalize_name(label), label))
+        return labels, label_rows, row_labels
+
+    def row_for_label(self, label: str) -> int:
+        if label not in self._label_rows:
+            raise KeyError(f"Player '{label}' not found in {self.dataset.league} {self.dataset.year}")
+        return self._label_rows[label]
+
+    def label_for_row(self, row: int) -> str:
+        return self._row_labels[row]
+
+    def get(self, label: str) -> pd.Series:
+        return self.dataset.players_df.iloc[self.row_for_label(label)]
+
+    def rows(self, name: str, team: str = None) -> list[int]:
+        key = normalize_name(name)
+        if team is not None:
+            return list(self._rows.get((key, team), []))
+        return list(self._name_rows.get(key, []))
+
+    def keys(self):
+        return self._rows.items()
+
+
+class PlayerIndex:
+    # Lookup across every registered league-season: (normalized name, season, league, team) → rows.
+    # Seasons are loaded on first use, and only those left possible by the season and league asked for.
+    def __init__(self, seasons, load):
+        self.seasons = list(seasons)  # (league, year) pairs
+        self.load = load
+
+    def lookup(self, name: str, year: str = None, league: str = None, team: str = None,
+               population_filter=None) -> list[PlayerMatch]:
+        # population_filter, e.g. a pipeline.PopulationFilter, leaves out the players it does not keep
+        matches = []
+        for season_league, season_year in self.seasons:
+            if year is not None and season_year != year:
+                continue
+            if league is not None and season_league != league:
+                continue
+            dataset = self.load(season_league, season_year)
+            rows = dataset.player_index.rows(name, team)
+            if population_filter and rows:
+                kept = population_filter.mask(dataset)
+                rows = [row for row in rows if kept[row]]
+            matches.extend(PlayerMatch(dataset, row) for row in rows)
+        return matches
+
+    def get(self, name: str, year: str = None, league: str = None, team: str = None,
+            population_filter=None) -> PlayerMatch:
+        matches = self.lookup(name, year, league, team, population_filter)
+        if not matches:
+            raise KeyError(f"Player '{name}' not found")
+        if len(matches) > 1:
+            options = ", ".join(
+                f"{match.dataset.league} {match.dataset.year} ({match.data.get('Team', '?')})" for match in matches
+            )
+            raise ValueError(f"Player '{name}' is ambiguous, narrow it down by season, league or team: {options}")
+        return matches[0]
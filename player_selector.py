@@ -1,18 +1,21 @@
 import streamlit as st
+from player_index import check_distinct, sorted_unique_names
 
 class PlayerSelector:
     def __init__(self, players_df):
         self.players_df = players_df
 
     def get_player_names(self):
-        return self.players_df['Player'].unique()
+        return sorted_unique_names(self.players_df['Player'])
 
     def select_players(self):
         player_names = self.get_player_names()
         player1 = st.selectbox("Select Player 1", player_names)
         player2 = st.selectbox("Select Player 2", player_names, index=1 if len(player_names) > 1 else 0)
 
-        if player1 == player2:
-            st.warning("Please select two different players to compare.")
+        try:
+            check_distinct(player1, player2)
+        except ValueError as exc:
+            st.warning(str(exc))
             st.stop()
         return player1, player2
@@ -0,0 +1,101 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from trajectory import season_sort_key
+
+# Background work never competes with more than this many threads for the GIL and the disk
+PREFETCH_WORKERS = 2
+# Jobs waiting or running at once; a new selection replaces the queued ones anyway
+MAX_PENDING = 6
+# Processed datasets held by the pipeline above which nothing more is prefetched
+MEMORY_LIMIT_BYTES = 512 * 1024 ** 2
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchScheduler:
+    # Loads and processes the league-seasons a scout is likely to pick next, in background
+    # threads, into the pipeline the app reads from, so a later selection is a cache hit.
+    # Likely-next means the other leagues of the chosen season and the neighbouring seasons of
+    # the chosen league, as listed in the registry. Every `schedule` call starts a new
+    # generation: queued jobs of the previous one are cancelled, running ones finish (a
+    # processed dataset is never wasted) and nothing is scheduled once the memory limit is hit.
+    def __init__(self, pipeline, workers: int = PREFETCH_WORKERS, max_pending: int = MAX_PENDING,
+                 memory_limit: int = MEMORY_LIMIT_BYTES):
+        self.pipeline = pipeline
+        self.max_pending = max_pending
+        self.memory_limit = memory_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._futures = {}  # (league, year) -> Future
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def likely_next(self, league: str, year: str) -> list:
+        registered = self.pipeline.dataset_loader.get_registered_datasets()
+        league, year = league.strip(), str(year).strip()
+        same_season = [(other, year) for other, other_year in registered if other_year == year and other != league]
+
+        seasons = sorted({other_year for other, other_year in registered if other == league}, key=season_sort_key)
+        adjacent = []
+        if year in seasons:
+            position = seasons.index(year)
+            # Previous season first, scouts mostly go back in time
+            adjacent = [(league, seasons[i]) for i in (position - 1, position + 1) if 0 <= i < len(seasons)]
+        return list(dict.fromkeys(adjacent + same_season))
+
+    def schedule(self, selections) -> list:
+        # selections: (league, year) pairs currently shown; returns the pairs queued
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            for pair, future in list(self._futures.items()):
+                if future.cancel() or future.done():
+                    del self._futures[pair]
+
+            candidates = []
+            for league, year in selections:
+                candidates.extend(self.likely_next(league, year))
+            wanted = [pair for pair in dict.fromkeys(candidates) if pair not in selections]
+
+            queued = []
+            for league, year in wanted:
+                if len(self._futures) >= self.max_pending:
+                    break
+                if (league, year) in self._futures or self.pipeline.is_processed(league, year):
+                    continue
+                if self.pipeline.memory_usage() >= self.memory_limit:
+                    logger.info("Prefetch skipped, processed datasets use more than %d bytes", self.memory_limit)
+                    break
+                self._futures[(league, year)] = self._executor.submit(self._prefetch, generation, league, year)
+                queued.append((league, year))
+            return queued
+
+    def _prefetch(self, generation: int, league: str, year: str):
+        try:
+            with self._lock:
+                if generation != self._generation or self.pipeline.memory_usage() >= self.memory_limit:
+                    return  # superseded while queued behind a running job
+            dataset = self.pipeline.get(league, year)
+            # The player selectbox reads the labels right after a selection
+            dataset.player_index
+        except Exception:
+            # A broken workbook surfaces in the foreground when it is actually selected
+            logger.warning("Prefetch of %s %s failed", league, year, exc_info=True)
+        finally:
+            with self._lock:
+                self._futures.pop((league, year), None)
+
+    def pending(self) -> list:
+        with self._lock:
+            return [pair for pair, future in self._futures.items() if not future.done()]
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            for future in self._futures.values():
+                future.cancel()
+
+    def shutdown(self, wait: bool = True):
+        self.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
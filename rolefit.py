@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+from dataset_cache import get_artifact_path, load_arrays, remove_stale_artifacts, save_arrays
+from enums import ExistentFieldPlayerColumn, Position, Stats
+from instrumentation import timed
+from normalization import NormalizationMode
+from similarity import position_group_codes
+
+
+def role_weights(roles, columns: list[str]) -> np.ndarray:
+    # stats × roles matrix; every role's metrics share its weight equally
+    weights = np.zeros((len(columns), len(roles)))
+    positions = {col: i for i, col in enumerate(columns)}
+    for j, role in enumerate(roles):
+        stats = list(dict.fromkeys(role.value))
+        for stat in stats:
+            weights[positions[stat], j] = 1.0 / len(stats)
+    return weights
+
+
+class RoleFitMatrix:
+    # Fit of every player of one league-season to every Stats role profile, as a players × roles
+    # matrix: the normalized players × stats block times the stats × roles weight matrix. Roles
+    # whose metrics the dataset does not all provide (e.g. keeper metrics on outfield data) are
+    # left out. Scores are persisted per dataset version, so a changed workbook alone is rescored.
+    # Every player is scored; with a pipeline.PopulationFilter the bounds come from the players it
+    # keeps, and only those are ranked.
+    def __init__(self, dataset, roles=None, mode: str = NormalizationMode.MIN_MAX, population_filter=None):
+        available = set(dataset.numeric_columns)
+        roles = [role for role in Stats if role.value] if roles is None else list(roles)
+        self.dataset = dataset
+        self.mode = mode
+        self.population_filter = population_filter if population_filter else None
+        self.roles = [role for role in roles if all(stat in available for stat in role.value)]
+        self.columns = list(dict.fromkeys(stat for role in self.roles for stat in role.value))
+        filter_key = self.population_filter.key if self.population_filter is not None else None
+        self.key = (dataset.key, tuple(role.name for role in self.roles), mode, filter_key)
+
+        path = get_artifact_path("rolefit", self.key, (dataset.scope, mode))
+        arrays = load_arrays(path)
+        if arrays is not None and arrays["scores"].shape == (len(dataset), len(self.roles)):
+            self.scores = arrays["scores"]
+        else:
+            self.scores = self._build()
+            try:
+                save_arrays(path, scores=self.scores)
+                remove_stale_artifacts(path)
+            except OSError:
+                pass  # persistence is best effort
+
+        self.role_index = {role: j for j, role in enumerate(self.roles)}
+        self.position_groups = position_group_codes(dataset.players_df["Primary position"].tolist())
+
+    @timed("RoleFitMatrix.build")
+    def _build(self) -> np.ndarray:
+        if not self.roles:
+            return np.empty((len(self.dataset), 0), dtype=np.float32)
+        normalized = self.dataset.baseline(self.population_filter).normalize(self.dataset.values(self.columns), self.columns, self.mode)
+        scores = np.nan_to_num(normalized, nan=0.0) @ role_weights(self.roles, self.columns)
+        return scores.astype(np.float32)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def best_role(self) -> np.ndarray:
+        # Index into `roles` of each player's highest score
+        return np.argmax(self.scores, axis=1) if self.roles else np.full(len(self), -1)
+
+    def frame(self, rows=None) -> pd.DataFrame:
+        # One line per player (all, or the given row positions) with a 0-100 score per role
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=int)
+        players_df = self.dataset.players_df.iloc[rows]
+        titles = _titles(self.roles)
+        best = self.best_role()[rows]
+        info = pd.DataFrame({
+            "Player": [self.dataset.player_index.label_for_row(int(row)) for row in rows],
+            "Team": players_df["Team"].to_numpy(),
+            "Primary position": players_df["Primary position"].to_numpy(),
+            "Age": players_df["Age"].to_numpy() if "Age" in players_df.columns else np.nan,
+            "Minutes played": players_df[ExistentFieldPlayerColumn.MINUTES_PLAYED.value].to_numpy(),
+            "Best role": [titles[j] if j >= 0 else None for j in best],
+        })
+        return pd.concat([info, pd.DataFrame(self.scores[rows] * 100, columns=titles)], axis=1)
+
+    @timed("RoleFitMatrix.top")
+    def top(self, role: Stats, k: int = 20, positions=None, min_minutes: float = None) -> pd.DataFrame:
+        # Best players for a role, optionally among the given Position groups and above a minutes floor
+        if role not in self.role_index:
+            raise KeyError(f"Role '{role.name}' is not scored for {self.dataset.league} {self.dataset.year}")
+        scores = self.scores[:, self.role_index[role]]
+        mask = np.ones(len(self), dtype=bool) if self.population_filter is None else self.population_filter.mask(self.dataset)
+        if positions:
+            members = list(Position)
+            mask &= np.isin(self.position_groups, [members.index(position) for position in positions])
+        if min_minutes is not None:
+            mask &= self.dataset.array(ExistentFieldPlayerColumn.MINUTES_PLAYED.value) > min_minutes
+
+        candidates = np.flatnonzero(mask)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+        result = self.frame(order)
+        result.insert(0, "Rank", np.arange(1, len(result) + 1))
+        return result
+
+
+def _titles(roles) -> list[str]:
+    return [role.name.replace("_", " ").title() for role in roles]
@@ -0,0 +1,349 @@
+import argparse
+import contextlib
+import math
+import threading
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from chart_plotter import MATPLOTLIB, SVG, RadarChartPlotter
+from data_loader import DatasetLoader, read_datasets_registry, read_player_data
+from enums import Position, Stats
+from normalization import NormalizationMode
+from pipeline import DEFAULT_MIN_MINUTES, Population, PopulationFilter, ProcessingPipeline
+from player_index import check_distinct
+from shared_store import SHARED_STORE
+
+BASELINES = ("league", "position")
+
+
+def _json_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "item"):
+        return _json_value(value.item())
+    return value
+
+
+class ComparisonService:
+    # Player lookup, normalization, comparison and radar rendering without any st.* call.
+    # Processed datasets live in the pipeline for the lifetime of the process and are
+    # shared by every request. Like the app, every player is processed and the population
+    # (players found, baselines) is a runtime filter, so both return the same numbers.
+    def __init__(self, pipeline: ProcessingPipeline = None, population_filter: PopulationFilter = None):
+        self.pipeline = pipeline or ProcessingPipeline(
+            DatasetLoader(read_datasets_registry()), compact=True, read_players=read_player_data, store=SHARED_STORE,
+            min_minutes=0,
+        )
+        if population_filter is None:
+            population_filter = PopulationFilter(min_minutes=DEFAULT_MIN_MINUTES)
+        self.population_filter = population_filter if population_filter else None
+        # pyplot figures are not thread-safe, renders of uncached charts run one at a time
+        self._render_lock = threading.Lock()
+
+    def preload(self):
+        self.pipeline.get_all()
+
+    def datasets(self) -> list[dict]:
+        return [
+            {
+                "league": dataset.league,
+                "year": dataset.year,
+                "players": len(Population([dataset], population_filter=self.population_filter)),
+            }
+            for dataset in self.pipeline.get_all()
+        ]
+
+    def find(self, name: str, year: str = None, league: str = None, team: str = None) -> list[dict]:
+        matches = self.pipeline.player_index().lookup(name, year, league, team, self.population_filter)
+        return [self._describe(match.dataset, match.row) for match in matches]
+
+    def resolve(self, reference: dict):
+        # {"league", "year", "player"} addresses a dataset label; {"name", ...} searches every season
+        if not isinstance(reference, dict):
+            raise ValueError("Each player reference must be an object with 'player', 'league' and 'year', or 'name'")
+        if reference.get("player") is not None and reference.get("league") and reference.get("year"):
+            dataset = self.pipeline.get(str(reference["league"]), str(reference["year"]))
+            row = dataset.player_index.row_for_label(str(reference["player"]))
+            if self.population_filter is not None and not self.population_filter.mask(dataset)[row]:
+                raise KeyError(f"Player '{reference['player']}' is outside the population of {dataset.league} {dataset.year}")
+            return dataset, row
+        name = reference.get("name") or reference.get("player")
+        if not name:
+            raise ValueError("A player reference needs 'player' with 'league' and 'year', or 'name'")
+        match = self.pipeline.player_index().get(
+            name, reference.get("year"), reference.get("league"), reference.get("team"), self.population_filter
+        )
+        return match.dataset, match.row
+
+    def select_stats(self, datasets, role: str = None, stats=None) -> list[str]:
+        _check_role(role)
+        if stats is not None and (not isinstance(stats, (list, tuple)) or not all(isinstance(stat, str) for stat in stats)):
+            raise ValueError("'stats' must be a list of stat names")
+        available = Population(datasets).numeric_columns
+        if role:
+            try:
+                requested = Stats[role.upper().replace(" ", "_")].value
+            except KeyError:
+                raise ValueError(f"Unknown role '{role}'") from None
+        else:
+            requested = list(stats or [])
+        missing = [stat for stat in requested if stat not in available] if not role else []
+        if missing:
+            raise ValueError(f"Unknown stats: {', '.join(missing)}")
+        selected = [stat for stat in requested if stat in available]
+        if not selected:
+            raise ValueError("Select at least one stat, either with 'role' or 'stats'")
+        return selected
+
+    def _for_role(self, resolved: list, role: str = None) -> list:
+        # Keepers are scored on keeper metrics against the keepers of their league-season
+        _check_role(role)
+        if role and role.upper().replace(" ", "_") == Stats.GOALKEEPER.name:
+            return [self.pipeline.goalkeeper_member(dataset, row) for dataset, row in resolved]
+        return resolved
+
+    def player_vector(self, reference: dict, role: str = None, stats=None, mode: str = NormalizationMode.MIN_MAX,
+                      baseline: str = "league") -> dict:
+        _check_mode(mode)
+        if baseline not in BASELINES:
+            raise ValueError(f"Unknown baseline '{baseline}', expected one of {', '.join(BASELINES)}")
+        dataset, row = self._for_role([self.resolve(reference)], role)[0]
+        columns = self.select_stats([dataset], role, stats)
+        player = dataset.players_df.iloc[row]
+
+        position = Position.from_code(player["Primary position"])
+        if baseline == "position" and position is not None:
+            index = dataset.position_baseline(position, self.population_filter)
+        else:
+            index = dataset.baseline(self.population_filter)
+
+        normalized = index.normalize_player(player, columns, mode)
+        return {
+            **self._describe(dataset, row),
+            "baseline": str(position) if baseline == "position" and position is not None else "league",
+            "mode": mode,
+            "stats": self._stat_values(player[columns].to_numpy(dtype=float), normalized.to_numpy(), columns),
+        }
+
+    def compare(self, references: list[dict], role: str = None, stats=None, mode: str = NormalizationMode.MIN_MAX) -> dict:
+        _check_mode(mode)
+        if len(references) < 2:
+            raise ValueError("A comparison needs at least two players")
+        resolved = [self.resolve(reference) for reference in references]
+        check_distinct(*[(dataset.key, row) for dataset, row in resolved])
+        resolved = self._for_role(resolved, role)
+
+        datasets = [dataset for dataset, _ in resolved]
+        columns = self.select_stats(datasets, role, stats)
+        # Every player is scaled against the union of their league-seasons, in one call
+        population = Population(datasets, population_filter=self.population_filter)
+        normalized = population.normalize_members(resolved, columns, mode)
+        values = population.member_values(resolved, columns)
+
+        players = [
+            {**self._describe(dataset, row), "stats": self._stat_values(values[i], normalized[i], columns)}
+            for i, (dataset, row) in enumerate(resolved)
+        ]
+        return {"mode": mode, "stats": columns, "players": players}
+
+    def role_fit(self, league: str, year: str, role: str, limit: int = 20, positions_only: bool = True,
+                 min_minutes: float = None) -> list[dict]:
+        # Best profiles for a role in one league-season, from the precomputed players × roles scores
+        try:
+            stats_role = Stats[role.upper().replace(" ", "_")]
+        except KeyError:
+            raise ValueError(f"Unknown role '{role}'") from None
+        if limit <= 0:
+            raise ValueError("'limit' must be positive")
+        dataset = self.pipeline.get(league, year)
+        if stats_role is Stats.GOALKEEPER:
+            dataset = self.pipeline.goalkeepers(dataset)
+        top = self.pipeline.role_fit(dataset, population_filter=self.population_filter).top(
+            stats_role, k=limit, positions=stats_role.positions if positions_only else None, min_minutes=min_minutes
+        )
+        return [{key: _json_value(value) for key, value in record.items()} for record in top.to_dict("records")]
+
+    def radar(self, references: list[dict], role: str = None, stats=None, mode: str = NormalizationMode.MIN_MAX,
+              renderer: str = MATPLOTLIB) -> bytes:
+        comparison = self.compare(references, role, stats, mode)
+        columns = comparison["stats"]
+        normalized = [[_nan(player["stats"][stat]["normalized"]) for stat in columns] for player in comparison["players"]]
+        real = [[_nan(player["stats"][stat]["value"]) for stat in columns] for player in comparison["players"]]
+        names = [f"{player['player']} ({player['year']})" for player in comparison["players"]]
+        if renderer == SVG:
+            return RadarChartPlotter.render(normalized, real, names, columns, mode, renderer=SVG)
+        with self._render_lock:
+            return RadarChartPlotter.render(normalized, real, names, columns, mode, renderer=renderer)
+
+    @staticmethod
+    def _describe(dataset, row: int) -> dict:
+        player = dataset.players_df.iloc[row]
+        return {
+            "player": dataset.player_index.label_for_row(row),
+            "team": _json_value(player.get("Team")),
+            "primary_position": _json_value(player.get("Primary position")),
+            "league": dataset.league,
+            "year": dataset.year,
+        }
+
+    @staticmethod
+    def _stat_values(values, normalized, columns) -> dict:
+        return {
+            # Raw values are rounded so float32 storage does not leak digits the export never had
+            stat: {"value": _json_value(round(float(value), 6)), "normalized": _json_value(float(scaled))}
+            for stat, value, scaled in zip(columns, values, normalized)
+        }
+
+
+def _check_role(role):
+    if role is not None and not isinstance(role, str):
+        raise ValueError("'role' must be a role name, e.g. 'STRIKER'")
+
+
+def _check_mode(mode: str):
+    if mode not in NormalizationMode.ALL:
+        raise ValueError(f"Unknown normalization mode '{mode}', expected one of {', '.join(NormalizationMode.ALL)}")
+
+
+def _nan(value):
+    return float("nan") if value is None else value
+
+
+# === HTTP API ===
+
+def _error(status: int, exc: Exception) -> JSONResponse:
+    message = exc.args[0] if exc.args else str(exc)
+    return JSONResponse({"error": str(message)}, status_code=status)
+
+
+async def _call(fn, *args, **kwargs):
+    # Pandas/NumPy/matplotlib work runs in the thread pool so the event loop keeps serving requests
+    try:
+        return await run_in_threadpool(fn, *args, **kwargs)
+    except KeyError as exc:
+        raise _HTTPError(404, exc) from exc
+    except ValueError as exc:
+        raise _HTTPError(400, exc) from exc
+
+
+class _HTTPError(Exception):
+    def __init__(self, status: int, exc: Exception):
+        super().__init__(str(exc))
+        self.response = _error(status, exc)
+
+
+async def _body(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError as exc:
+        raise _HTTPError(400, ValueError("Request body must be JSON")) from exc
+    if not isinstance(body, dict) or not isinstance(body.get("players"), list):
+        raise _HTTPError(400, ValueError("Request body needs a 'players' list"))
+    return body
+
+
+def create_app(service: ComparisonService = None, preload: bool = True) -> Starlette:
+    service = service or ComparisonService()
+
+    async def health(request):
+        return JSONResponse({"status": "ok"})
+
+    async def datasets(request):
+        return JSONResponse(await _call(service.datasets))
+
+    async def players(request):
+        params = request.query_params
+        if not params.get("name"):
+            return _error(400, ValueError("Query parameter 'name' is required"))
+        return JSONResponse(await _call(
+            service.find, params["name"], params.get("year"), params.get("league"), params.get("team")
+        ))
+
+    async def vector(request):
+        params = request.query_params
+        reference = {key: params.get(key) for key in ("player", "name", "league", "year", "team")}
+        return JSONResponse(await _call(
+            service.player_vector, reference, params.get("role"), params.getlist("stat"),
+            params.get("mode", NormalizationMode.MIN_MAX), params.get("baseline", "league"),
+        ))
+
+    async def roles(request):
+        params = request.query_params
+        missing = [key for key in ("league", "year", "role") if not params.get(key)]
+        if missing:
+            return _error(400, ValueError(f"Query parameters required: {', '.join(missing)}"))
+        try:
+            limit = int(params.get("limit", 20))
+            min_minutes = float(params["min_minutes"]) if params.get("min_minutes") else None
+        except ValueError:
+            return _error(400, ValueError("'limit' and 'min_minutes' must be numbers"))
+        return JSONResponse(await _call(
+            service.role_fit, params["league"], params["year"], params["role"], limit,
+            params.get("all_positions") != "1", min_minutes,
+        ))
+
+    async def compare(request):
+        body = await _body(request)
+        return JSONResponse(await _call(
+            service.compare, body["players"], body.get("role"), body.get("stats"), body.get("mode", NormalizationMode.MIN_MAX)
+        ))
+
+    async def radar(request):
+        body = await _body(request)
+        image_format = body.get("format", "png")
+        if image_format not in ("png", "svg"):
+            return _error(400, ValueError("'format' must be 'png' or 'svg'"))
+        renderer = SVG if image_format == "svg" else MATPLOTLIB
+        image = await _call(
+            service.radar, body["players"], body.get("role"), body.get("stats"), body.get("mode", NormalizationMode.MIN_MAX), renderer
+        )
+        return Response(image, media_type="image/svg+xml" if renderer == SVG else "image/png")
+
+    async def http_error(request, exc):
+        return exc.response
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        if preload:
+            # Every registered league-season is processed before the first request
+            await run_in_threadpool(service.preload)
+        yield
+
+    app = Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/datasets", datasets),
+            Route("/players", players),
+            Route("/players/vector", vector),
+            Route("/roles", roles),
+            Route("/compare", compare, methods=["POST"]),
+            Route("/radar", radar, methods=["POST"]),
+        ],
+        exception_handlers={_HTTPError: http_error},
+        lifespan=lifespan,
+    )
+    app.state.service = service
+    return app
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve player lookup, comparisons and radar charts over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-preload", action="store_true", help="Process league-seasons on first use instead of at startup")
+    parser.add_argument("--min-minutes", type=float, default=DEFAULT_MIN_MINUTES,
+                        help="Players with these minutes or fewer are not found and not part of the baselines (0: everyone)")
+    args = parser.parse_args(argv)
+
+    service = ComparisonService(population_filter=PopulationFilter(min_minutes=args.min_minutes or None))
+    uvicorn.run(create_app(service, preload=not args.no_preload), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from compact_table import CompactPlayerTable
+from dataset_cache import CACHE_DIR
+
+# Memory-mapped copies of loaded and processed league-seasons, shared by every process on the host
+SHARED_DIR = os.path.join(CACHE_DIR, "shared")
+META_FILE = "meta.json"
+OTHER_FILE = "other.parquet"
+INDEX_COLUMN = "__index__"
+
+
+def shared_name(kind: str, scope, key) -> str:
+    # "<kind>-<scope hash>-<key hash>": entries of one scope (workbook, league-season) replace each other
+    scope_hash = hashlib.sha1(repr(scope).encode("utf-8")).hexdigest()[:8]
+    key_hash = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:12]
+    return f"{kind}-{scope_hash}-{key_hash}"
+
+
+class SharedStore:
+    # Read-only frames and compact tables stored as .npy blocks and opened with mmap. Every
+    # session and worker process maps the same files, so the page cache holds one physical
+    # copy of each league-season and a hit costs neither unpickling nor copying. Frames handed
+    # out are views: pandas copy-on-write copies a column before it is ever modified.
+    def __init__(self, directory: str = SHARED_DIR):
+        self.directory = directory
+        self._opened = {}
+        self._lock = threading.Lock()
+
+    def entry_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def frame(self, name: str, build, cacheable=None) -> pd.DataFrame:
+        return self._get(name, build, _frame_parts, _open_frame, cacheable)
+
+    def table(self, name: str, build, cacheable=None) -> CompactPlayerTable:
+        return self._get(name, build, _table_parts, _open_table, cacheable)
+
+    def _get(self, name: str, build, to_parts, open_entry, cacheable=None):
+        # cacheable(value) returning False hands a built value out without publishing it
+        path = self.entry_path(name)
+        with self._lock:
+            opened = self._opened.get(name)
+        if opened is not None and os.path.isdir(path):
+            return opened
+
+        opened = self._open(path, open_entry)
+        if opened is None:
+            value = build()
+            if cacheable is not None and not cacheable(value):
+                return value
+            try:
+                self._publish(path, *to_parts(value))
+            except Exception:
+                # Sharing is best effort (read-only filesystem, column types parquet rejects...)
+                return value
+            self.remove_stale(name)
+            opened = self._open(path, open_entry)
+            if opened is None:
+                return value
+
+        with self._lock:
+            return self._opened.setdefault(name, opened)
+
+    @staticmethod
+    def _open(path: str, open_entry):
+        if not os.path.isdir(path):
+            return None
+        try:
+            with open(os.path.join(path, META_FILE), encoding="utf-8") as handle:
+                meta = json.load(handle)
+            blocks = {block: np.load(os.path.join(path, f"{block}.npy"), mmap_mode="r") for block in meta["blocks"]}
+            other = pd.read_parquet(os.path.join(path, OTHER_FILE))
+            return open_entry(blocks, other, meta)
+        except Exception:
+            return None  # partial or unreadable entry, rebuilt by the caller
+
+    def _publish(self, path: str, blocks: dict, other: pd.DataFrame, meta: dict):
+        # Written to a temporary directory and renamed, readers never see a partial entry
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_path)
+            for block, values in blocks.items():
+                np.save(os.path.join(tmp_path, f"{block}.npy"), values)
+            other.to_parquet(os.path.join(tmp_path, OTHER_FILE), index=False)
+            with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as handle:
+                json.dump({**meta, "blocks": list(blocks)}, handle)
+            try:
+                os.replace(tmp_path, path)
+            except OSError:
+                pass  # published by another process meanwhile, theirs is used
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def remove_stale(self, name: str):
+        # Older versions of the same scope; processes still mapping them keep their pages until they close
+        prefix = name.rsplit("-", 1)[0]
+        with self._lock:
+            for opened_name in [key for key in self._opened if key.startswith(f"{prefix}-") and key != name]:
+                del self._opened[opened_name]
+        for stale_path in glob.glob(os.path.join(self.directory, f"{glob.escape(prefix)}-*")):
+            if os.path.basename(stale_path) != name and not stale_path.endswith(".tmp"):
+                shutil.rmtree(stale_path, ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            self._opened.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _frame_parts(df: pd.DataFrame):
+    # One column-major block per numeric dtype, so every column is a contiguous slice of the file
+    blocks = {}
+    block_columns = {}
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "fiu":
+            block_columns.setdefault(dtype.name, []).append(column)
+    for dtype, columns in block_columns.items():
+        blocks[dtype] = np.asfortranarray(df[columns].to_numpy(dtype=dtype))
+
+    in_blocks = {column for columns in block_columns.values() for column in columns}
+    other = df[[column for column in df.columns if column not in in_blocks]].copy()
+    other[INDEX_COLUMN] = df.index
+    return blocks, other, {"columns": list(df.columns), "block_columns": block_columns, "index_name": df.index.name}
+
+
+def _open_frame(blocks: dict, other: pd.DataFrame, meta: dict) -> pd.DataFrame:
+    index = pd.Index(other.pop(INDEX_COLUMN).array, name=meta.get("index_name"))
+    other.index = index
+    parts = [
+        pd.DataFrame(blocks[dtype], columns=columns, index=index, copy=False)
+        for dtype, columns in meta["block_columns"].items()
+    ]
+    return pd.concat(parts + [other], axis=1)[meta["columns"]]
+
+
+def _table_parts(table: CompactPlayerTable):
+    other = pd.DataFrame(table.other_columns, index=table.index)
+    other[INDEX_COLUMN] = table.index
+    return {"stats": table.stats}, other, {
+        "stat_columns": table.stat_columns, "columns": table.column_order, "index_name": table.index.name,
+    }
+
+
+def _open_table(blocks: dict, other: pd.DataFrame, meta: dict) -> CompactPlayerTable:
+    index = pd.Index(other.pop(INDEX_COLUMN).array, name=meta.get("index_name"))
+    other_columns = {
+        column: other[column].array if isinstance(other[column].dtype, pd.CategoricalDtype) else other[column].to_numpy()
+        for column in other.columns
+    }
+    return CompactPlayerTable(blocks["stats"], meta["stat_columns"], other_columns, meta["columns"], index)
+
+
+SHARED_STORE = SharedStore()
@@ -0,0 +1,194 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import get_artifact_path, load_arrays, remove_stale_artifacts, save_arrays
+from enums import ExistentFieldPlayerColumn, Position
+from instrumentation import timed
+
+# Neighbours stored per player; larger queries fall back to a scan of the standardized matrix
+NEIGHBOURS_PER_PLAYER = 50
+BLOCK_SIZE = 1024
+NO_POSITION = -1
+# Features are standardized against regular players whatever population is shown; runtime
+# filters (pipeline.PopulationFilter) only narrow the candidates of a query
+STANDARDIZATION_MIN_MINUTES = 600
+
+
+def position_group_codes(positions) -> np.ndarray:
+    # Index of the Position enum member for each raw position code, NO_POSITION when unknown
+    members = list(Position)
+    groups = [Position.from_code(code) for code in positions]
+    return np.array([members.index(group) if group is not None else NO_POSITION for group in groups], dtype=np.int16)
+
+
+class SimilarityIndex:
+    # Cosine similarity over standardized per-90 features of every loaded league-season
+    def __init__(self, datasets, features: list[str] = None, neighbours: int = NEIGHBOURS_PER_PLAYER,
+                 min_minutes: float = STANDARDIZATION_MIN_MINUTES):
+        self.datasets = list(datasets)
+        self.min_minutes = min_minutes
+        if features is None:
+            features = ExistentFieldPlayerColumn.values_for_similarity()
+        # Keep only the features every dataset provides
+        self.features = [
+            feature for feature in features
+            if all(feature in dataset.players_df.columns for dataset in self.datasets)
+        ]
+        self.neighbours = neighbours
+        self.key = (tuple(dataset.key for dataset in self.datasets), tuple(self.features), neighbours, min_minutes)
+
+        self._dataset_offsets = np.cumsum([0] + [len(dataset) for dataset in self.datasets])
+        self.dataset_ids = np.repeat(np.arange(len(self.datasets)), [len(dataset) for dataset in self.datasets])
+        self.rows = np.concatenate([np.arange(len(dataset)) for dataset in self.datasets]) if self.datasets else np.empty(0, dtype=int)
+        self.position_codes = [code for dataset in self.datasets for code in dataset.players_df["Primary position"].tolist()]
+        self.teams = [team for dataset in self.datasets for team in dataset.players_df["Team"].tolist()]
+        self.positions = position_group_codes(self.position_codes)
+
+        path = get_artifact_path("similarity", self.key, tuple(dataset.scope for dataset in self.datasets))
+        arrays = load_arrays(path)
+        if arrays is None or len(arrays["vectors"]) != len(self.rows):
+            arrays = self._build()
+            try:
+                save_arrays(path, **arrays)
+                remove_stale_artifacts(path)
+            except OSError:
+                pass  # persistence is best effort, the in-memory index is still usable
+
+        self.mean = arrays["mean"]
+        self.std = arrays["std"]
+        self.vectors = arrays["vectors"]
+        self.neighbour_ids = arrays["neighbour_ids"]
+        self.neighbour_scores = arrays["neighbour_scores"]
+        self.position_neighbour_ids = arrays["position_neighbour_ids"]
+        self.position_neighbour_scores = arrays["position_neighbour_scores"]
+
+    def _build(self) -> dict:
+        if self.datasets:
+            values = np.vstack([dataset.players_df[self.features].to_numpy(dtype=np.float64) for dataset in self.datasets])
+        else:
+            values = np.empty((0, len(self.features)))
+
+        # Standardize once; missing values land on the mean (0 after scaling)
+        minutes = ExistentFieldPlayerColumn.MINUTES_PLAYED.value
+        regular = np.concatenate([dataset.array(minutes) > self.min_minutes for dataset in self.datasets]) \
+            if self.datasets else np.empty(0, dtype=bool)
+        baseline = values[regular] if regular.any() else values
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)  # empty population or all-NaN feature
+            mean = np.nanmean(baseline, axis=0) if len(baseline) else np.zeros(len(self.features))
+            std = np.nanstd(baseline, axis=0) if len(baseline) else np.ones(len(self.features))
+        std = np.where((std == 0) | np.isnan(std), 1.0, std)
+        mean = np.nan_to_num(mean)
+        standardized = np.nan_to_num((values - mean) / std)
+
+        # Unit rows, so a dot product is the cosine similarity
+        norms = np.linalg.norm(standardized, axis=1, keepdims=True)
+        vectors = (standardized / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+        neighbour_ids, neighbour_scores = self._top_neighbours(vectors, same_position=False)
+        position_neighbour_ids, position_neighbour_scores = self._top_neighbours(vectors, same_position=True)
+
+        return {
+            "mean": mean,
+            "std": std,
+            "vectors": vectors,
+            "neighbour_ids": neighbour_ids,
+            "neighbour_scores": neighbour_scores,
+            "position_neighbour_ids": position_neighbour_ids,
+            "position_neighbour_scores": position_neighbour_scores,
+        }
+
+    def _top_neighbours(self, vectors: np.ndarray, same_position: bool):
+        # Blocked matrix product so the full players × players matrix never lives in memory
+        total = len(vectors)
+        k = min(self.neighbours, max(total - 1, 0))
+        ids = np.full((total, k), -1, dtype=np.int32)
+        scores = np.full((total, k), np.nan, dtype=np.float32)
+        if k == 0:
+            return ids, scores
+
+        for start in range(0, total, BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, total)
+            block_scores = vectors[start:stop] @ vectors.T
+            block_scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+            if same_position:
+                different = self.positions[start:stop, None] != self.positions[None, :]
+                block_scores[different] = -np.inf
+
+            top = np.argpartition(-block_scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(block_scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            valid = np.isfinite(top_scores)
+            ids[start:stop] = np.where(valid, top, -1)
+            scores[start:stop] = np.where(valid, top_scores, np.nan)
+
+        return ids, scores
+
+    def position_of(self, dataset, row: int) -> int:
+        for i, candidate in enumerate(self.datasets):
+            if candidate.key == dataset.key:
+                return int(self._dataset_offsets[i] + row)
+        raise KeyError(f"{dataset!r} is not part of this similarity index")
+
+    def allowed(self, population_filter) -> np.ndarray:
+        # Flat mask over every indexed player, e.g. from a pipeline.PopulationFilter
+        if not self.datasets:
+            return np.empty(0, dtype=bool)
+        return np.concatenate([population_filter.mask(dataset) for dataset in self.datasets])
+
+    @timed("SimilarityIndex.query")
+    def query(self, dataset, row: int, k: int = 10, same_position: bool = False, population_filter=None) -> pd.DataFrame:
+        position = self.position_of(dataset, row)
+        allowed = self.allowed(population_filter) if population_filter else None
+
+        ids = self.position_neighbour_ids if same_position else self.neighbour_ids
+        scores = self.position_neighbour_scores if same_position else self.neighbour_scores
+        ids, scores = ids[position], scores[position]
+        valid = ids >= 0
+        if allowed is not None:
+            valid &= allowed[np.where(valid, ids, 0)]
+        # A full list may have left out candidates; a list with free slots holds every candidate there is
+        stored_list_full = bool((ids >= 0).all()) and len(ids) == self.neighbours
+
+        if valid.sum() >= k or not stored_list_full:
+            # Enough stored neighbours pass the filter, or every candidate is already stored
+            ids, scores = ids[valid][:k], scores[valid][:k]
+        else:
+            ids, scores = self._scan(position, k, same_position, allowed)
+
+        return self._result(ids, scores)
+
+    def _scan(self, position: int, k: int, same_position: bool, allowed: np.ndarray = None):
+        scores = self.vectors @ self.vectors[position]
+        scores[position] = -np.inf
+        if same_position:
+            scores[self.positions != self.positions[position]] = -np.inf
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k == 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def _result(self, ids: np.ndarray, scores: np.ndarray) -> pd.DataFrame:
+        records = []
+        for player_id, score in zip(ids, scores):
+            dataset = self.datasets[self.dataset_ids[player_id]]
+            row = int(self.rows[player_id])
+            records.append({
+                "Player": dataset.player_index.label_for_row(row),
+                "Team": self.teams[player_id],
+                "Primary position": self.position_codes[player_id],
+                "League": dataset.league,
+                "Year": dataset.year,
+                "Similarity": float(score),
+                "row": row,
+            })
+        return pd.DataFrame(records, columns=["Player", "Team", "Primary position", "League", "Year", "Similarity", "row"])
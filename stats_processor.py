@@ -1,46 +1,149 @@
+import hashlib
+import numpy as np
 import pandas as pd
-from enums import ToCreateColumns, ExistentFieldPlayerColumn, ColumnMapping, Position
+from enums import ColumnMapping, ExistentFieldPlayerColumn, ExistentGoalkeeperColumn, Position, Stats
+from instrumentation import annotate, timed
+from normalization import NormalizationIndex, NormalizationMode
+
+
+class DerivedColumnEngine:
+    RATIO = "ratio"
+    PERCENTAGE = "percentage"
+
+    def __init__(self):
+        # new column -> (kind, (first input column, second input column))
+        self.definitions = {}
+
+    @classmethod
+    def from_schema(cls):
+        return cls.from_mappings(ColumnMapping.RATIO_MAPPING, ColumnMapping.COLUMN_MAPPING)
+
+    @classmethod
+    def from_goalkeeper_schema(cls):
+        return cls.from_mappings(ColumnMapping.GOALKEEPER_RATIO_MAPPING, ColumnMapping.GOALKEEPER_COLUMN_MAPPING)
+
+    @classmethod
+    def from_mappings(cls, ratio_mapping: dict, column_mapping: dict):
+        engine = cls()
+        for new_col, (numerator, denominator) in ratio_mapping.items():
+            engine.register(new_col, cls.RATIO, numerator, denominator)
+        for new_col, (base_col, pct_col) in column_mapping.items():
+            engine.register(new_col, cls.PERCENTAGE, base_col, pct_col)
+        return engine
+
+    def register(self, name: str, kind: str, first_col: str, second_col: str):
+        # ratio: first / second (0 when second is 0); percentage: first * second / 100
+        if kind not in (self.RATIO, self.PERCENTAGE):
+            raise ValueError(f"Unknown derived column kind '{kind}'")
+        self.definitions[name] = (kind, (first_col, second_col))
+
+    def unregister(self, name: str):
+        self.definitions.pop(name, None)
+
+    @property
+    def schema_version(self) -> str:
+        # Changes whenever a derived metric is registered, removed or redefined
+        key = repr(sorted(self.definitions.items()))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+    def compute(self, df: pd.DataFrame, names=None) -> pd.DataFrame:
+        # Returns only the derived columns, computed in one batched pass per kind
+        names = list(self.definitions) if names is None else names
+        columns = set(df.columns)
+        derived = {}
+
+        for kind in (self.RATIO, self.PERCENTAGE):
+            targets = [
+                name for name in names
+                if self.definitions[name][0] == kind and set(self.definitions[name][1]) <= columns
+            ]
+            if not targets:
+                continue
+
+            first = df[[self.definitions[name][1][0] for name in targets]].to_numpy(dtype=float)
+            second = df[[self.definitions[name][1][1] for name in targets]].to_numpy(dtype=float)
+
+            if kind == self.RATIO:
+                values = np.zeros_like(first)
+                np.divide(first, second, out=values, where=second != 0)
+            else:
+                values = first * (np.nan_to_num(second, nan=0.0) / 100)
+
+            derived.update(zip(targets, values.T))
+
+        return pd.DataFrame({name: derived[name] for name in names if name in derived}, index=df.index)
+
+
+# Shared engine used by every StatsProcessor; register extra metrics here
+DERIVED_COLUMNS = DerivedColumnEngine.from_schema()
+# Keeper-only metrics, derived by GoalkeeperStatsProcessor
+GOALKEEPER_DERIVED_COLUMNS = DerivedColumnEngine.from_goalkeeper_schema()
+
+# Numeric columns a keeper frame keeps besides the keeper metrics; text columns are always kept
+GOALKEEPER_CONTEXT_COLUMNS = ["Age", ExistentFieldPlayerColumn.MATCHES_PLAYED.value, ExistentFieldPlayerColumn.MINUTES_PLAYED.value]
+
 
 class StatsProcessor:
-    def __init__(self, players_df: pd.DataFrame):
+    def __init__(self, players_df: pd.DataFrame, engine: DerivedColumnEngine = None):
         self.players_df = players_df.copy()
         self.players_df.columns = [col.strip() for col in self.players_df.columns]
+        self.engine = engine or DERIVED_COLUMNS
+        self._normalization_index = None
 
+    @timed("StatsProcessor.create_columns")
     def create_columns(self):
-        # Calculate Shot Efficiency
-        self.players_df[ToCreateColumns.SHOT_EFFICIENCY.value] = self.players_df.apply(
-            lambda row: row[ExistentFieldPlayerColumn.GOALS_PER_90.value] / row[ExistentFieldPlayerColumn.XG_PER_90.value]
-            if row[ExistentFieldPlayerColumn.XG_PER_90.value] != 0 else 0,
-            axis=1
-        )
-
-        # Compute derived stats using percentage mappings
-        for new_col, (base_col, pct_col) in ColumnMapping.COLUMN_MAPPING.items():
-            if base_col in self.players_df.columns and pct_col in self.players_df.columns:
-                self.players_df[new_col] = (
-                    self.players_df[base_col] *
-                    (self.players_df[pct_col].fillna(0) / 100)
-                )
+        annotate(rows=len(self.players_df))
+        # Derived columns are pure functions of their inputs, so already derived frames are left as is
+        missing = [name for name in self.engine.definitions if name not in self.players_df.columns]
+        if not missing:
+            return
+
+        derived_df = self.engine.compute(self.players_df, missing)
+        self.players_df = pd.concat([self.players_df, derived_df], axis=1)
+        self._normalization_index = None
 
     def get_numeric_stats_columns(self) -> list[str]:
         return self.players_df.select_dtypes(include='number').columns.tolist()
 
-    def normalize(self, column_name: str, values):
+    @property
+    def normalization_index(self) -> NormalizationIndex:
+        # Built lazily, then reused for every player and stat normalized against this frame
+        if self._normalization_index is None:
+            self._normalization_index = NormalizationIndex(self.players_df)
+        return self._normalization_index
+
+    @timed("StatsProcessor.normalize")
+    def normalize(self, column_name: str, values, mode: str = NormalizationMode.MIN_MAX):
         if column_name not in self.players_df.columns:
             raise KeyError(f"Column '{column_name}' not found in DataFrame columns")
 
-        min_val = self.players_df[column_name].min()
-        max_val = self.players_df[column_name].max()
-        if max_val == min_val:
-            return 0
-        return (values - min_val) / (max_val - min_val)
-
-    def get_normalized_stats(self, player_row: pd.Series, columns: list[str]) -> pd.Series:
-        normalized = {}
-        for col in columns:
-            if col in player_row:
-                normalized[col] = self.normalize(col, player_row[col])
-            else:
-                # Handle missing column; could set to NaN or 0 or skip
-                normalized[col] = float('nan')  # or 0
-        return pd.Series(normalized)
\ No newline at end of file
+        return self.normalization_index.normalize_column(column_name, values, mode)
+
+    @timed("StatsProcessor.get_normalized_stats")
+    def get_normalized_stats(self, player_row: pd.Series, columns: list[str], mode: str = NormalizationMode.MIN_MAX) -> pd.Series:
+        # Columns missing from the player row are NaN
+        return self.normalization_index.normalize_player(player_row, columns, mode)
+
+
+class GoalkeeperStatsProcessor:
+    # Goalkeepers of a processed league-season, projected to keeper metrics. The ~100 outfield
+    # columns are dropped, so keeper baselines are built over keepers and their own stats only.
+    def __init__(self, players_df: pd.DataFrame, engine: DerivedColumnEngine = None):
+        self.engine = engine or GOALKEEPER_DERIVED_COLUMNS
+        positions = players_df["Primary position"].tolist()
+        # Row positions of the keepers in the frame they were taken from
+        self.rows = np.flatnonzero([Position.from_code(code) is Position.GOALKEEPER for code in positions])
+
+        numeric = set(players_df.select_dtypes(include="number").columns)
+        keep = set(GOALKEEPER_CONTEXT_COLUMNS + ExistentGoalkeeperColumn.all_values() + Stats.GOALKEEPER.value)
+        for inputs in self.engine.definitions.values():
+            keep.update(inputs[1])
+        columns = [col for col in players_df.columns if col not in numeric or col in keep]
+        self.players_df = players_df.iloc[self.rows][columns]
+
+    @timed("GoalkeeperStatsProcessor.create_columns")
+    def create_columns(self):
+        annotate(rows=len(self.players_df))
+        missing = [name for name in self.engine.definitions if name not in self.players_df.columns]
+        if missing:
+            self.players_df = pd.concat([self.players_df, self.engine.compute(self.players_df, missing)], axis=1)
@@ -1,13 +1,78 @@
-import streamlit as st
+import os
+import uuid
+
 import pandas as pd
-from data_loader import DatasetLoader, load_player_data
-from stats_processor import StatsProcessor
-from chart_plotter import RadarChartPlotter
+import streamlit as st
+from archetypes import ARCHETYPES_PATH, ArchetypeLookup
+from data_loader import DatasetLoader, read_shared_player_data
+from instrumentation import RECORDER, profiling_forced
+from pipeline import DEFAULT_MIN_MINUTES, Population, PopulationFilter, ProcessingPipeline
+from prefetch import PrefetchScheduler
+from shared_store import SHARED_STORE
+from leaderboard import LeaderboardQuery
+from chart_plotter import SVG, RadarChartPlotter
 from enums import Position, Stats
 
+# One pipeline per server process, so processed datasets survive reruns and are shared by sessions
+@st.cache_resource
+def get_processing_pipeline():
+    # Every player is processed; the minutes threshold is a runtime filter, see population_filter().
+    # Workbooks are read without st.* calls since the prefetch threads share this pipeline.
+    return ProcessingPipeline(DatasetLoader(), compact=True, read_players=read_shared_player_data, store=SHARED_STORE,
+                              min_minutes=0)
+
+# Processes the seasons a scout is likely to pick next while they are still looking at this one
+@st.cache_resource
+def get_prefetch_scheduler():
+    return PrefetchScheduler(get_processing_pipeline())
+
+# Archetypes come precomputed from `python archetypes.py`; a new run of the job is a new version
+@st.cache_resource(max_entries=1)
+def get_archetype_lookup(version):
+    return ArchetypeLookup.load(ARCHETYPES_PATH)
+
+def archetypes_version():
+    try:
+        return os.stat(ARCHETYPES_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+# Shortlists larger than this make the radar unreadable
+MAX_COMPARED_PLAYERS = 8
+
+MAX_MIN_MINUTES = 3000
+
+# Timings of the last reruns kept per session for the debug panel export
+TIMING_HISTORY = 20
+
+def show_timing_panel(profile):
+    history = st.session_state.setdefault("timing_history", [])
+    history.append(profile.to_json())
+    del history[:-TIMING_HISTORY]
+
+    with st.sidebar.expander("⏱️ Rerun timings", expanded=True):
+        st.caption(f"Rerun {profile.labels.get('rerun')}: {profile.duration * 1000:.1f} ms")
+        summary = [
+            {"Step": name, "Calls": entry["calls"], "Total ms": round(entry["total_ms"], 2),
+             "Cache hits": entry["hits"], "Cache misses": entry["misses"]}
+            for name, entry in sorted(profile.summary().items(), key=lambda item: -item[1]["total_ms"])
+        ]
+        st.dataframe(summary, hide_index=True)
+        spans = [
+            {"Step": "  " * record["depth"] + record["name"], "ms": record["duration_ms"],
+             "Details": ", ".join(f"{key}={value}" for key, value in record.items()
+                                  if key not in ("name", "depth", "start_ms", "duration_ms"))}
+            for record in profile.records()
+        ]
+        st.dataframe(spans, hide_index=True)
+        st.download_button("Download timings (JSON lines)", "\n".join(history) + "\n",
+                           file_name="rerun_timings.jsonl", mime="application/json")
+
 class PlayerComparisonApp:
     def __init__(self):
         self.dataset_loader = DatasetLoader()
+        self.pipeline = get_processing_pipeline()
+        self.prefetcher = get_prefetch_scheduler()
 
     def get_color(self, percent):
         if percent >= 70:
@@ -19,6 +84,114 @@ class PlayerComparisonApp:
         else:
             return "red"
 
+    def show_leaderboard(self, dataset, selected_stats, role=None, population_filter=None):
+        st.header("🏆 Leaderboard")
+
+        scope = st.radio("Players from:", [f"{dataset.league} {dataset.year}", "All league-seasons"], horizontal=True)
+        datasets = [dataset] if scope != "All league-seasons" else None
+        leaderboard = self.pipeline.leaderboard(datasets, population_filter)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            min_minutes = st.number_input("Minimum minutes played", min_value=0, value=900, step=90)
+        with col2:
+            max_age = st.number_input("Maximum age", min_value=15, max_value=45, value=45)
+        with col3:
+            only_role_positions = st.checkbox("Only the role's positions", value=role is not None, disabled=role is None)
+
+        query = LeaderboardQuery(
+            {stat: 1.0 for stat in selected_stats},
+            positions=role.positions if role is not None and only_role_positions else None,
+            min_minutes=min_minutes,
+            max_age=max_age,
+        )
+
+        page_size = 20
+        first_page = leaderboard.query(query, page=0, page_size=page_size)
+        page = st.number_input("Page", min_value=1, max_value=first_page.page_count, value=1) - 1
+        results = first_page if page == 0 else leaderboard.query(query, page=page, page_size=page_size)
+
+        st.caption(f"{results.total} players match, page {page + 1} of {results.page_count}")
+        st.dataframe(results.rows, hide_index=True)
+
+    def show_role_fit(self, dataset, default_role=None, population_filter=None):
+        st.header("🧩 Role fit")
+
+        roles = [role for role in Stats if role.value]
+        role = st.selectbox("Best profiles for:", roles, index=roles.index(default_role) if default_role in roles else 0,
+                            format_func=lambda role: role.name.replace("_", " ").title())
+        if role is Stats.GOALKEEPER:
+            # Keeper metrics only exist on the keeper dataset
+            dataset = self.pipeline.goalkeepers(dataset)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            min_minutes = st.number_input("Minimum minutes played", min_value=0, value=900, step=90, key="role_fit_minutes")
+        with col2:
+            only_role_positions = st.checkbox("Only the role's positions", value=True, key="role_fit_positions")
+
+        # Every player is scored against every role once per league-season; this is a sort
+        role_fit = self.pipeline.role_fit(dataset, population_filter=population_filter)
+        st.dataframe(
+            role_fit.top(role, k=20, positions=role.positions if only_role_positions else None, min_minutes=min_minutes),
+            hide_index=True,
+        )
+
+    def population_filter(self) -> PopulationFilter:
+        # Masks over the cached datasets: moving a slider never reloads or reprocesses a workbook
+        with st.sidebar.expander("Population", expanded=False):
+            min_minutes = st.slider("Minimum minutes played", 0, MAX_MIN_MINUTES, DEFAULT_MIN_MINUTES, step=30)
+            min_age, max_age = st.slider("Age", 15, 45, (15, 45))
+            positions = st.multiselect("Positions", list(Position), format_func=str)
+        return PopulationFilter(
+            min_minutes=min_minutes or None,
+            min_age=min_age if min_age > 15 else None,
+            max_age=max_age if max_age < 45 else None,
+            positions=positions,
+        )
+
+    def select_player(self, number, available_years, dataset_metadata, population_filter=None):
+        st.sidebar.subheader(f"Player {number} Filters")
+        year = st.sidebar.selectbox(f"Select year (Player {number}):", available_years, key=f"year{number}")
+        leagues = dataset_metadata[dataset_metadata['YEAR'] == year]['LEAGUE'].unique()
+        league = st.sidebar.selectbox(f"Select league (Player {number}):", leagues, key=f"league{number}")
+        # Processed (derived + tagged) once per league-season, then reused across reruns
+        dataset = self.load_dataset(league, year)
+        if not dataset.complete:
+            st.warning(f"The {league} {year} workbook looks truncated, only its first {len(dataset)} players are shown.")
+
+        # Sorted labels; homonyms are disambiguated by team instead of silently taking the first row
+        player_names = dataset.player_index.labels
+        if population_filter:
+            mask = population_filter.mask(dataset)
+            player_names = [label for label in player_names if mask[dataset.player_index.row_for_label(label)]]
+        if not player_names:
+            st.warning(f"No player of {league} {year} matches the population filters.")
+            st.stop()
+        player_name = st.sidebar.selectbox(f"Select player {number}:", player_names, key=f"player{number}")
+        return dataset, player_name
+
+    def load_dataset(self, league, year):
+        if self.pipeline.is_processed(league, year):
+            return self.pipeline.get(league, year)
+
+        # Cold load: a workbook streamed for this rerun reports how far the read got
+        progress = st.progress(0.0, text=f"Loading {league} {year}...")
+
+        def on_progress(read):
+            total = f" of {read.total_rows}" if read.total_rows else ""
+            progress.progress(read.fraction or 0.0, text=f"Loading {league} {year}: {read.rows_read}{total} rows read")
+
+        try:
+            return self.pipeline.get(league, year, on_progress=on_progress)
+        finally:
+            progress.empty()
+
+    def goalkeeper_view(self, dataset, name):
+        # Same player in the keeper-only dataset of their league-season
+        goalkeepers, row = self.pipeline.goalkeeper_member(dataset, dataset.player_index.row_for_label(name))
+        return goalkeepers, goalkeepers.player_index.label_for_row(row)
+
     def run(self):
         st.title("Player Comparison App")
 
@@ -28,51 +201,47 @@ class PlayerComparisonApp:
         dataset_metadata = self.dataset_loader.get_metadata()
         available_years = self.dataset_loader.get_years()
 
+        population_filter = self.population_filter()
+
         # Player 1 filters
-        st.sidebar.subheader("Player 1 Filters")
-        year1 = st.sidebar.selectbox("Select year (Player 1):", available_years, key="year1")
-        leagues1 = dataset_metadata[dataset_metadata['YEAR'] == year1]['LEAGUE'].unique()
-        league1 = st.sidebar.selectbox("Select league (Player 1):", leagues1, key="league1")
-        dataset_path1 = self.dataset_loader.get_dataset_path(league1, year1)
-        players_df1 = load_player_data(dataset_path1)
-        
-        # Initialize StatsProcessor for player 1 data and create new columns
-        stats_processor1 = StatsProcessor(players_df1)
-        stats_processor1.create_columns()
-        
-        # Select player names from the processed DataFrame to include new columns
-        player_names1 = stats_processor1.players_df['Full name'].unique()
-        player1_name = st.sidebar.selectbox("Select player 1:", player_names1, key="player1")
+        dataset1, player1_name = self.select_player(1, available_years, dataset_metadata, population_filter)
 
         st.sidebar.markdown("---")
 
         # Toggle comparison
-        compare_two_players = st.sidebar.checkbox("Compare with a second player", value=True)
-
-        if compare_two_players:
-            st.sidebar.subheader("Player 2 Filters")
-            year2 = st.sidebar.selectbox("Select year (Player 2):", available_years, key="year2")
-            leagues2 = dataset_metadata[dataset_metadata['YEAR'] == year2]['LEAGUE'].unique()
-            league2 = st.sidebar.selectbox("Select league (Player 2):", leagues2, key="league2")
-            dataset_path2 = self.dataset_loader.get_dataset_path(league2, year2)
-            players_df2 = load_player_data(dataset_path2)
-            
-            stats_processor2 = StatsProcessor(players_df2)
-            stats_processor2.create_columns()
-            
-            player_names2 = stats_processor2.players_df['Full name'].unique()
-            player2_name = st.sidebar.selectbox("Select player 2:", player_names2, key="player2")
+        compare_players = st.sidebar.checkbox("Compare with other players", value=True)
+
+        other_players = []
+        if compare_players:
+            player_count = st.sidebar.number_input("Players to compare:", min_value=2, max_value=MAX_COMPARED_PLAYERS, value=2)
+            for number in range(2, player_count + 1):
+                other_players.append(self.select_player(number, available_years, dataset_metadata, population_filter))
+
+        # Neighbouring seasons and the other leagues of the selected seasons load in the background
+        self.prefetcher.schedule([(dataset1.league, dataset1.year)] + [(dataset.league, dataset.year) for dataset, _ in other_players])
 
         st.sidebar.markdown("---")
 
         # === Configuration Selector ===
-        config_options = [config.name.replace("_", " ").title() for config in Stats]
+        # Outfield profiles first: the default must fit the player listed first, who is rarely a keeper
+        roles = sorted((config for config in Stats if config.value), key=lambda config: config is Stats.GOALKEEPER)
+        config_options = [config.name.replace("_", " ").title() for config in roles]
         config_options.append("Custom")
 
         selected_config = st.sidebar.selectbox("Select role configuration:", config_options)
 
+        # Keepers are compared on keeper metrics, against the keepers of their league-season only
+        season_dataset1, season_player1_name = dataset1, player1_name
+        if selected_config == "Goalkeeper":
+            try:
+                dataset1, player1_name = self.goalkeeper_view(dataset1, player1_name)
+                other_players = [self.goalkeeper_view(dataset, name) for dataset, name in other_players]
+            except ValueError as exc:
+                st.warning(str(exc))
+                st.stop()
+
         # === Stat Selection ===
-        numeric_cols = stats_processor1.get_numeric_stats_columns()
+        numeric_cols = dataset1.numeric_columns
 
         if selected_config == "Custom":
             selected_stats = st.sidebar.multiselect(
@@ -94,76 +263,70 @@ class PlayerComparisonApp:
             st.info("Please select at least one stat to proceed.")
             return
 
-        # Select player1_data from stats_processor1's processed DataFrame
-        player1_data = stats_processor1.players_df[stats_processor1.players_df['Full name'] == player1_name].iloc[0]
-        player1_stats_norm = stats_processor1.get_normalized_stats(player1_data, selected_stats)
+        if st.sidebar.checkbox("Show leaderboard for the selected stats"):
+            role = None if selected_config == "Custom" else Stats[selected_config.upper().replace(" ", "_")]
+            self.show_leaderboard(dataset1, selected_stats, role, population_filter)
 
-        if compare_two_players:
-            # Prepare both datasets
-            stats_processor1.players_df["Year"] = year1
-            stats_processor1.players_df["League"] = league1
-            stats_processor2.players_df["Year"] = year2
-            stats_processor2.players_df["League"] = league2
+        if st.sidebar.checkbox("Show role fit for the league-season"):
+            role = None if selected_config == "Custom" else Stats[selected_config.upper().replace(" ", "_")]
+            self.show_role_fit(season_dataset1, role, population_filter)
 
-            stats_processor1.players_df["name_year"] = stats_processor1.players_df["Full name"] + f" ({year1})"
-            stats_processor2.players_df["name_year"] = stats_processor2.players_df["Full name"] + f" ({year2})"
+        player1_data = dataset1.player_index.get(player1_name)
 
-            player1_name_year = f"{player1_name} ({year1})"
-            player2_name_year = f"{player2_name} ({year2})"
+        if compare_players:
+            members = [
+                (dataset, dataset.player_index.row_for_label(name))
+                for dataset, name in [(dataset1, player1_name)] + other_players
+            ]
+            names = [f"{name} ({dataset.year})" for dataset, name in [(dataset1, player1_name)] + other_players]
 
-            if year1 == year2 and league1 == league2:
-                # Use one DataFrame and processor for both players
-                stats_processor = StatsProcessor(stats_processor1.players_df)
-                stats_processor.create_columns()
-
-                player1_data = stats_processor.players_df[stats_processor.players_df["name_year"] == player1_name_year].iloc[0]
-                player2_data = stats_processor.players_df[stats_processor.players_df["name_year"] == player2_name_year].iloc[0]
-
-            else:
-                # Combine processed DataFrames from both processors
-                combined_df = pd.concat([stats_processor1.players_df, stats_processor2.players_df], ignore_index=True)
-                stats_processor = StatsProcessor(combined_df)
-                stats_processor.create_columns()
-
-                player1_data = stats_processor.players_df[stats_processor.players_df["name_year"] == player1_name_year].iloc[0]
-                player2_data = stats_processor.players_df[stats_processor.players_df["name_year"] == player2_name_year].iloc[0]
-
-            player1_stats_norm = stats_processor.get_normalized_stats(player1_data, selected_stats)
-            player2_stats_norm = stats_processor.get_normalized_stats(player2_data, selected_stats)
-
-            player1_stats_real = player1_data[selected_stats]
-            player2_stats_real = player2_data[selected_stats]
+            # Union of the selected league-seasons (duplicates collapse); bounds are cached per
+            # population and every player is normalized in a single call
+            population = Population([dataset for dataset, _ in members], population_filter=population_filter)
+            stats_norm = population.normalize_members(members, selected_stats)
+            stats_real = population.member_values(members, selected_stats)
 
             RadarChartPlotter.plot(
-                [player1_stats_norm, player2_stats_norm],
-                [player1_stats_real, player2_stats_real],
-                [player1_name_year, player2_name_year],
-                selected_stats
+                list(stats_norm),
+                list(stats_real),
+                names,
+                selected_stats,
+                # Vector output stays interactive with long custom stat lists
+                renderer=SVG,
             )
 
+            with st.expander("Normalized values per stat"):
+                st.bar_chart(
+                    pd.DataFrame(stats_norm.T * 100, index=selected_stats, columns=names),
+                    horizontal=True, stack=False, y_label="%",
+                )
+
         else:
             st.header(f"🔎 {player1_name} – Attribute Overview")
 
             player1_position = player1_data["Primary position"]
+            # Group raw codes ("LCB3", "RAMF"...) by role for larger, more stable baselines
+            player1_position_group = Position.from_code(player1_position)
+            position_label = str(player1_position_group) if player1_position_group else player1_position
 
             # Toggle: normalize relative to same-position players or all players
-            normalize_by_position = st.toggle(f"Normalize relative to average {player1_position}", value=True)
-
-            if normalize_by_position:
-                # Filter players with same position (including player1)
-                base_players = stats_processor1.players_df[
-                    stats_processor1.players_df["Primary position"] == player1_position
-                ]
+            normalize_by_position = st.toggle(f"Normalize relative to average {position_label}", value=True)
+
+            population = Population([dataset1], population_filter=population_filter)
+            if normalize_by_position and player1_position_group is not None:
+                # Precomputed per league-season, position group and filter, so toggling is a lookup
+                normalization_index = population.position_baseline(player1_position_group)
+            elif normalize_by_position:
+                # Unknown position code, fall back to players with the exact same code
+                normalization_index = Population(
+                    [dataset1], [("Primary position", [player1_position])], population_filter
+                ).normalization_index
             else:
-                # Use all players
-                base_players = stats_processor1.players_df
-
-            # Create a temp processor with the chosen base players for normalization
-            temp_stats_processor = StatsProcessor(base_players)
-            temp_stats_processor.create_columns()
+                # Use all players of the population
+                normalization_index = population.normalization_index
 
             # Normalize player1 stats based on chosen base group
-            player1_stats_norm = temp_stats_processor.get_normalized_stats(player1_data, selected_stats)
+            player1_stats_norm = normalization_index.normalize_player(player1_data, selected_stats)
 
             # Divide selected stats into two columns
             half = (len(selected_stats) + 1) // 2
@@ -203,13 +366,74 @@ class PlayerComparisonApp:
                         </div>
                     """, unsafe_allow_html=True)
 
-
-
-
-
-
+            # === Similar players across every league-season ===
+            if st.checkbox("Show similar players"):
+                same_position = st.checkbox("Only players from the same position group", value=True)
+                similarity_index = self.pipeline.similarity_index()
+                similar_players = similarity_index.query(
+                    season_dataset1, season_dataset1.player_index.row_for_label(season_player1_name), k=10,
+                    same_position=same_position, population_filter=population_filter,
+                )
+                st.dataframe(similar_players.drop(columns=["row"]), hide_index=True)
+
+            # === Season-over-season trajectory of the same player ===
+            if st.checkbox("Show season-over-season trajectory"):
+                trajectory = self.pipeline.trajectory_index(population_filter).trajectory(
+                    season_dataset1, season_dataset1.player_index.row_for_label(season_player1_name)
+                )
+                trajectory["Season"] = trajectory["League"] + " " + trajectory["Year"]
+                seasons = trajectory["Season"].unique().tolist()
+                if len(seasons) < 2:
+                    st.info("No other season found for this player.")
+
+                # Percentile within each league-season, so seasons in different leagues stay comparable
+                chart = trajectory[trajectory["Stat"].isin(selected_stats)].pivot(index="Season", columns="Stat", values="Percentile")
+                st.line_chart(chart.reindex(seasons))
+                table = trajectory.pivot(index="Stat", columns="Season", values="Value")[seasons]
+                percentiles = trajectory.pivot(index="Stat", columns="Season", values="Percentile")[seasons]
+                st.dataframe(table.round(3).astype(str) + " (" + percentiles.round(0).astype("Int64").astype(str) + "%)")
+
+            # === Playing-style archetype, read from the offline clustering job ===
+            if st.checkbox("Show playing-style archetype"):
+                lookup = get_archetype_lookup(archetypes_version())
+                row = season_dataset1.player_index.row_for_label(season_player1_name)
+                member = lookup.member(season_dataset1, row) if lookup is not None else None
+                archetype = lookup.archetype(member) if member is not None else None
+                if lookup is None or member is None:
+                    st.info("This league-season has not been clustered yet, run `python archetypes.py`.")
+                elif archetype is None:
+                    st.info("Archetypes are only computed for outfield position groups.")
+                else:
+                    st.markdown(f"**{archetype['position']} archetype {archetype['label'] + 1}:** {archetype['name']} "
+                                f"(distance to its centre {archetype['distance']:.2f})")
+                    st.dataframe(lookup.peers(member), hide_index=True)
+
+
+
+
+
+
+
+
+def main():
+    # Add ?debug=1 to the URL for the timing panel; PLAYER_APP_PROFILE=1 records every session
+    show_timings = st.query_params.get("debug") == "1"
+    if not (show_timings or profiling_forced()):
+        PlayerComparisonApp().run()
+        return
+
+    session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    st.session_state["rerun"] = st.session_state.get("rerun", 0) + 1
+    RECORDER.start(session=session_id, rerun=st.session_state["rerun"])
+    try:
+        app = PlayerComparisonApp()
+        app.run()
+    finally:
+        profile = RECORDER.finish()
+
+    if show_timings:
+        show_timing_panel(profile)
 
 
 if __name__ == "__main__":
-    app = PlayerComparisonApp()
-    app.run()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from enums import Position
+from leaderboard import Leaderboard, LeaderboardQuery
+from normalization import NormalizationMode
+from pipeline import PopulationFilter, ProcessedDataset
+
+WEIGHTS = {"Goals per 90": 2.0, "xG per 90": 1.0, "Height": 1.0}
+POSITIONS = ["CF", "LW", "RCB", "DMF", "GK"]
+
+
+def season(league, year, size, seed):
+    rng = np.random.default_rng(seed)
+    players_df = pd.DataFrame({
+        "Player": [f"P. {league} {i}" for i in range(size)],
+        "Full name": [f"Player {league} {year} {i}" for i in range(size)],
+        "Team": rng.choice(["Farul", "Rapid", "Nafta"], size),
+        "Primary position": rng.choice(POSITIONS, size),
+        "Age": rng.integers(17, 36, size).astype(float),
+        "Minutes played": rng.integers(0, 3000, size).astype(float),
+        "Goals per 90": rng.random(size),
+        "xG per 90": rng.random(size),
+        "Height": np.nan,  # missing from the export
+    })
+    players_df.loc[rng.random(size) < 0.1, "xG per 90"] = np.nan
+    return ProcessedDataset(league, year, players_df, key=(league, year, "leaderboard"))
+
+
+@pytest.fixture
+def datasets():
+    return [season("ROMANIA", "24-25", 300, 1), season("BOSNIA", "24-25", 120, 2)]
+
+
+def reference(datasets, query, population_filter=None):
+    # Scores with pandas: min-max within each league-season over the filtered population, weighted mean
+    frames = []
+    for dataset in datasets:
+        players_df = dataset.players_df
+        kept = population_filter.mask(dataset) if population_filter else np.ones(len(dataset), dtype=bool)
+        score = 0
+        for column, weight in query.weights.items():
+            baseline = players_df.loc[kept, column]
+            scaled = (players_df[column] - baseline.min()) / (baseline.max() - baseline.min())
+            score = score + weight * scaled.fillna(0)
+        frame = players_df.assign(League=dataset.league, Score=score / sum(query.weights.values()), kept=kept)
+        frames.append(frame)
+    players_df = pd.concat(frames, ignore_index=True)
+
+    selected = players_df["kept"]
+    if query.min_minutes is not None:
+        selected &= players_df["Minutes played"] > query.min_minutes
+    if query.positions:
+        codes = [code for position in query.positions for code in position.value]
+        selected &= players_df["Primary position"].isin(codes)
+    return players_df[selected].sort_values("Score", ascending=False, kind="stable")
+
+
+@pytest.mark.parametrize("page", [0, 1, 3])
+def test_pages_match_a_full_pandas_sort(datasets, page):
+    query = LeaderboardQuery(WEIGHTS, min_minutes=600)
+
+    result = Leaderboard(datasets).query(query, page=page, page_size=20)
+
+    expected = reference(datasets, query).iloc[page * 20:(page + 1) * 20]
+    assert result.total == len(reference(datasets, query))
+    assert result.rows["League"].tolist() == expected["League"].tolist()
+    np.testing.assert_allclose(result.rows["Score"], expected["Score"])
+    assert result.rows["Rank"].tolist() == list(range(page * 20 + 1, page * 20 + 1 + len(expected)))
+
+
+def test_population_filter_narrows_the_ranking_and_the_bounds(datasets):
+    population_filter = PopulationFilter(min_minutes=1500)
+    query = LeaderboardQuery(WEIGHTS, positions=[Position.STRIKER, Position.LEFT_WINGER])
+
+    result = Leaderboard(datasets, population_filter).query(query, page_size=50)
+
+    expected = reference(datasets, query, population_filter).iloc[:50]
+    assert result.total == len(reference(datasets, query, population_filter))
+    assert (result.rows["Minutes played"] > 1500).all()
+    np.testing.assert_allclose(result.rows["Score"], expected["Score"])
+
+
+def test_an_empty_population_gives_an_empty_page(datasets):
+    query = LeaderboardQuery(WEIGHTS, min_minutes=10_000, mode=NormalizationMode.PERCENTILE)
+
+    result = Leaderboard(datasets).query(query)
+
+    assert result.total == 0
+    assert result.rows.empty
+    assert list(result.rows.columns)[-len(WEIGHTS):] == list(WEIGHTS)
@@ -0,0 +1,69 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from normalization import NormalizationIndex, NormalizationMode
+
+COLUMNS = ["Goals per 90", "xG per 90", "Height", "Shots per 90"]
+
+
+@pytest.fixture
+def population():
+    rng = np.random.default_rng(3)
+    values = rng.integers(0, 8, size=(200, len(COLUMNS))).astype(float)  # repeated values exercise ties
+    values[rng.random(values.shape) < 0.1] = np.nan
+    values[:, 2] = np.nan  # a stat the export left empty
+    values[:, 3] = 1.5  # a constant stat
+    return values
+
+
+def brute_force_percentile(population_values, values):
+    # Share of the population's non-missing values at or below each value
+    valid = population_values[~np.isnan(population_values)]
+    if not len(valid):
+        return np.full(len(values), np.nan)
+    return np.array([np.nan if np.isnan(value) else np.mean(valid <= value) for value in values])
+
+
+def test_percentile_ranks_match_a_brute_force_count(population):
+    index = NormalizationIndex.from_values(population, COLUMNS)
+    players = np.vstack([population[:25], [[-1.0, 9.0, 2.0, 1.5]], [[np.nan, 3.0, np.nan, np.nan]]])
+
+    ranks = index.normalize(players, COLUMNS, NormalizationMode.PERCENTILE)
+
+    for i, column in enumerate(COLUMNS):
+        np.testing.assert_allclose(ranks[:, i], brute_force_percentile(population[:, i], players[:, i]))
+
+
+def test_min_max_matches_the_column_bounds(population):
+    index = NormalizationIndex.from_values(population, COLUMNS)
+    players = population[:25]
+
+    scaled = index.normalize(players, COLUMNS)
+
+    for i in range(2):
+        low, high = np.nanmin(population[:, i]), np.nanmax(population[:, i])
+        np.testing.assert_allclose(scaled[:, i], (players[:, i] - low) / (high - low))
+    assert np.isnan(scaled[:, 2]).all()
+    assert (scaled[:, 3] == 0).all()
+
+
+def test_stats_outside_the_index_stay_missing(population):
+    index = NormalizationIndex.from_values(population, COLUMNS)
+
+    scaled = index.normalize(population[:3, :2], ["Goals per 90", "Assists per 90"], NormalizationMode.PERCENTILE)
+
+    assert not np.isnan(scaled[:, 0]).any()
+    assert np.isnan(scaled[:, 1]).all()
+
+
+@pytest.mark.parametrize("mode", NormalizationMode.ALL)
+def test_an_empty_population_normalizes_to_missing_values(mode):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        index = NormalizationIndex.from_values(np.empty((0, len(COLUMNS))), COLUMNS)
+        scaled = index.normalize(np.ones((2, len(COLUMNS))), COLUMNS, mode)
+
+    assert index.size == 0
+    assert np.isnan(scaled).all()
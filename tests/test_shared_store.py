@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compact_table import CompactPlayerTable
+from shared_store import SharedStore, shared_name
+
+
+@pytest.fixture
+def players_df():
+    return pd.DataFrame({
+        "Player": ["A. Pihler", "B. Other", None],
+        "Minutes played": [1800, 440, 2000],
+        "Goals per 90": [0.2, np.nan, 0.4],
+        "Height": [np.nan, np.nan, np.nan],
+        "On loan": [False, True, False],
+    }, index=pd.Index([10, 11, 12], name="row"))
+
+
+def test_frames_read_back_equal_from_another_store(tmp_path, players_df):
+    calls = []
+    name = shared_name("players", "workbook", "v1")
+
+    first = SharedStore(str(tmp_path)).frame(name, lambda: calls.append(1) or players_df)
+    # A second process maps the published files instead of building again
+    second = SharedStore(str(tmp_path)).frame(name, lambda: calls.append(2) or players_df)
+
+    assert calls == [1]
+    pd.testing.assert_frame_equal(first, players_df)
+    pd.testing.assert_frame_equal(second, players_df)
+
+
+def test_values_not_cacheable_are_handed_out_but_not_published(tmp_path, players_df):
+    store = SharedStore(str(tmp_path))
+    name = shared_name("players", "workbook", "v1")
+    calls = []
+
+    for _ in range(2):
+        frame = store.frame(name, lambda: calls.append(1) or players_df, cacheable=lambda df: False)
+        pd.testing.assert_frame_equal(frame, players_df)
+
+    assert len(calls) == 2
+    assert not (tmp_path / name).exists()
+
+
+def test_a_new_version_replaces_the_old_one_of_the_same_scope(tmp_path, players_df):
+    store = SharedStore(str(tmp_path))
+    old = shared_name("players", "workbook", "v1")
+    new = shared_name("players", "workbook", "v2")
+    other = shared_name("players", "other workbook", "v1")
+
+    for name in (old, other, new):
+        store.frame(name, lambda: players_df)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted([new, other])
+
+
+def test_compact_tables_read_back_equal(tmp_path, players_df):
+    table = CompactPlayerTable.from_frame(players_df)
+    name = shared_name("table", "league-season", "v1")
+
+    SharedStore(str(tmp_path)).table(name, lambda: table)
+    shared = SharedStore(str(tmp_path)).table(name, lambda: pytest.fail("built again"))
+
+    np.testing.assert_array_equal(shared.stats, table.stats)
+    pd.testing.assert_frame_equal(shared.frame, table.frame)
+
+
+def test_an_empty_frame_round_trips(tmp_path, players_df):
+    empty = players_df.iloc[:0]
+    name = shared_name("players", "workbook", "empty")
+
+    SharedStore(str(tmp_path)).frame(name, lambda: empty)
+    shared = SharedStore(str(tmp_path)).frame(name, lambda: pytest.fail("built again"))
+
+    pd.testing.assert_frame_equal(shared, empty)
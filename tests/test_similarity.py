@@ -0,0 +1,125 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset_cache
+from pipeline import PopulationFilter, ProcessedDataset
+from similarity import SimilarityIndex, position_group_codes
+
+FEATURES = ["Goals per 90", "xG per 90", "Passes per 90", "Height"]
+POSITIONS = ["CF", "LW", "RCB", "DMF", "GK"]
+NEIGHBOURS = 8
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path))
+
+
+def season(league, year, size, seed):
+    rng = np.random.default_rng(seed)
+    players_df = pd.DataFrame({
+        "Player": [f"P. {i}" for i in range(size)],
+        "Full name": [f"Player {league} {year} {i}" for i in range(size)],
+        "Team": rng.choice(["Farul", "Rapid"], size),
+        "Primary position": rng.choice(POSITIONS, size),
+        "Minutes played": rng.integers(0, 3000, size).astype(float),
+        "Goals per 90": rng.random(size),
+        "xG per 90": rng.random(size),
+        "Passes per 90": rng.normal(40, 10, size),
+        "Height": np.nan,  # missing from the export
+    })
+    players_df.loc[rng.random(size) < 0.1, "xG per 90"] = np.nan
+    return ProcessedDataset(league, year, players_df, key=(league, year, "similarity"))
+
+
+@pytest.fixture
+def datasets():
+    return [season("ROMANIA", "24-25", 700, 1), season("BOSNIA", "24-25", 500, 2)]
+
+
+def brute_force(datasets, dataset_index, row, k, same_position=False, population_filter=None):
+    # Cosine similarity on features standardized against the regular players, every candidate scored
+    players_df = pd.concat([dataset.players_df for dataset in datasets], ignore_index=True)
+    values = players_df[FEATURES].to_numpy(dtype=float)
+    regular = values[players_df["Minutes played"].to_numpy() > 600]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # the all-NaN Height column
+        mean = np.nan_to_num(np.nanmean(regular, axis=0))
+        std = np.nanstd(regular, axis=0)
+    std = np.where((std == 0) | np.isnan(std), 1.0, std)
+    vectors = np.nan_to_num((values - mean) / std)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    position = sum(len(dataset) for dataset in datasets[:dataset_index]) + row
+    scores = vectors @ vectors[position]
+    candidates = np.ones(len(players_df), dtype=bool)
+    candidates[position] = False
+    if same_position:
+        groups = position_group_codes(players_df["Primary position"])
+        candidates &= groups == groups[position]
+    if population_filter is not None:
+        candidates &= np.concatenate([population_filter.mask(dataset) for dataset in datasets])
+
+    ids = np.flatnonzero(candidates)
+    ids = ids[np.argsort(-scores[ids], kind="stable")][:k]
+    leagues = np.concatenate([[dataset.league] * len(dataset) for dataset in datasets])
+    rows = np.concatenate([np.arange(len(dataset)) for dataset in datasets])
+    return leagues[ids], rows[ids], scores[ids]
+
+
+def check(result, expected):
+    leagues, rows, scores = expected
+    assert result["League"].tolist() == leagues.tolist()
+    assert result["row"].tolist() == rows.tolist()
+    np.testing.assert_allclose(result["Similarity"], scores, atol=1e-5)
+
+
+@pytest.mark.parametrize("same_position", [False, True])
+@pytest.mark.parametrize("k", [5, NEIGHBOURS, 3 * NEIGHBOURS])
+def test_neighbours_match_a_brute_force_scan(datasets, k, same_position):
+    # k above the stored neighbours falls back to scanning the standardized matrix
+    index = SimilarityIndex(datasets, FEATURES, neighbours=NEIGHBOURS)
+
+    for dataset_index, row in [(0, 0), (0, 311), (1, 42)]:
+        result = index.query(datasets[dataset_index], row, k=k, same_position=same_position)
+        check(result, brute_force(datasets, dataset_index, row, k, same_position))
+
+
+def test_population_filter_narrows_candidates_without_rebuilding(datasets):
+    index = SimilarityIndex(datasets, FEATURES, neighbours=NEIGHBOURS)
+    vectors = index.vectors.copy()
+
+    for population_filter in [PopulationFilter(min_minutes=600), PopulationFilter(min_minutes=2900)]:
+        result = index.query(datasets[0], 5, k=10, population_filter=population_filter)
+        check(result, brute_force(datasets, 0, 5, 10, population_filter=population_filter))
+    np.testing.assert_array_equal(index.vectors, vectors)
+
+
+def test_an_empty_population_finds_nobody(datasets):
+    index = SimilarityIndex(datasets, FEATURES, neighbours=NEIGHBOURS)
+
+    result = index.query(datasets[0], 5, k=10, population_filter=PopulationFilter(min_minutes=10_000))
+
+    assert result.empty
+
+
+def test_small_populations_store_every_candidate():
+    datasets = [season("ROMANIA", "24-25", 6, 3)]
+    index = SimilarityIndex(datasets, FEATURES, neighbours=NEIGHBOURS)
+
+    result = index.query(datasets[0], 0, k=10)
+
+    check(result, brute_force(datasets, 0, 0, 10))
+    assert len(result) == 5
+
+
+def test_the_persisted_index_is_reused(datasets, tmp_path):
+    built = SimilarityIndex(datasets, FEATURES, neighbours=NEIGHBOURS)
+    loaded = SimilarityIndex(datasets, FEATURES, neighbours=NEIGHBOURS)
+
+    assert len(list(tmp_path.glob("similarity-*.npz"))) == 1
+    np.testing.assert_array_equal(loaded.neighbour_ids, built.neighbour_ids)
+    check(loaded.query(datasets[1], 7, k=5), brute_force(datasets, 1, 7, 5))
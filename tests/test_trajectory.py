@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+import dataset_cache
+from pipeline import ProcessedDataset
+from trajectory import TrajectoryIndex
+
+COLUMNS = ["Goals per 90", "Assists per 90"]
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path))
+
+
+def season(league, year, players):
+    players_df = pd.DataFrame(players, columns=["Player", "Full name", "Team", "Birthday", "Primary position",
+                                                "Minutes played", *COLUMNS])
+    return ProcessedDataset(league, year, players_df, key=(league, year, "test"))
+
+
+def test_trajectory_has_one_row_per_season_when_a_player_is_listed_twice():
+    # Mid-season transfer: two rows for the same person in one league-season
+    earlier = season("ROMANIA", "23-24", [
+        ("A. Pihler", "Aleks Pihler", "Nafta", "1994-01-15", "CMF", 1800, 0.2, 0.1),
+        ("B. Other", "Bogdan Other", "Farul", "1996-03-02", "CF", 2000, 0.4, 0.0),
+    ])
+    later = season("ROMANIA", "24-25", [
+        ("A. Pihler", "Aleks Pihler", "Nafta", "1994-01-15", "CMF", 440, 0.0, 0.0),
+        ("A. Pihler", "Aleks  Pihler", "Rapid", "1994-01-15", "CMF", 1200, 0.3, 0.2),
+        ("B. Other", "Bogdan Other", "Farul", "1996-03-02", "CF", 1500, 0.1, 0.3),
+    ])
+    index = TrajectoryIndex(COLUMNS)
+    index.update([earlier, later])
+
+    trajectory = index.trajectory(later, 0)
+    trajectory["Season"] = trajectory["League"] + " " + trajectory["Year"]
+    chart = trajectory.pivot(index="Season", columns="Stat", values="Percentile")
+
+    assert chart.index.tolist() == ["ROMANIA 23-24", "ROMANIA 24-25"]
+    # The stint with the most minutes stands for the season
+    latest = trajectory[trajectory["Year"] == "24-25"]
+    assert set(latest["Team"]) == {"Rapid"}
+    assert latest.set_index("Stat").loc["Goals per 90", "Value"] == pytest.approx(0.3)
@@ -0,0 +1,80 @@
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from workbook_reader import READ_ERROR_ATTR, is_complete, project, stream_player_data
+
+SIZE = 400
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    rng = np.random.default_rng(5)
+    players_df = pd.DataFrame({
+        "Player": [f"P. {i}" for i in range(SIZE)],
+        "Team": rng.choice(["Farul", "Rapid"], SIZE),
+        "Minutes played": rng.integers(0, 3000, SIZE),
+        "Goals per 90": rng.random(SIZE),
+        "Height": np.nan,  # missing from the export
+        "On loan": rng.random(SIZE) < 0.2,
+        "Notes": "not a stat",  # never loaded
+    })
+    players_df.loc[rng.random(SIZE) < 0.1, "Goals per 90"] = np.nan
+    path = tmp_path / "players.xlsx"
+    players_df.to_excel(path, index=False)
+    return path
+
+
+def reference(path, min_minutes):
+    players_df = project(pd.read_excel(path))
+    return players_df[players_df["Minutes played"] > min_minutes].reset_index(drop=True)
+
+
+def truncated(path, tmp_path):
+    # Cut the sheet XML in half, as an interrupted download or copy leaves it
+    target = tmp_path / "truncated.xlsx"
+    with zipfile.ZipFile(path) as source, zipfile.ZipFile(target, "w") as copy:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = data[:len(data) // 2]
+            copy.writestr(item, data)
+    return target
+
+
+@pytest.mark.parametrize("min_minutes", [0, 600])
+def test_streamed_rows_match_read_excel(workbook, min_minutes):
+    players_df = stream_player_data(str(workbook), min_minutes=min_minutes)
+
+    assert "Notes" not in players_df.columns
+    assert is_complete(players_df)
+    pd.testing.assert_frame_equal(players_df, reference(workbook, min_minutes))
+
+
+def test_an_empty_population_keeps_the_columns(workbook):
+    players_df = stream_player_data(str(workbook), min_minutes=10_000)
+
+    assert players_df.empty
+    assert list(players_df.columns) == list(reference(workbook, 10_000).columns)
+
+
+def test_a_truncated_sheet_yields_the_leading_rows(workbook, tmp_path):
+    players_df = stream_player_data(str(truncated(workbook, tmp_path)), min_minutes=600)
+
+    expected = reference(workbook, 600)
+    assert not is_complete(players_df)
+    assert players_df.attrs[READ_ERROR_ATTR]
+    assert 0 < len(players_df) < len(expected)
+    pd.testing.assert_frame_equal(players_df, expected.iloc[:len(players_df)], check_dtype=False)
+
+
+def test_progress_is_reported_until_complete(workbook):
+    reports = []
+
+    players_df = stream_player_data(str(workbook), min_minutes=600, on_progress=lambda progress: reports.append(
+        (progress.rows_read, progress.rows_kept, progress.complete, progress.fraction)))
+
+    assert reports[-1] == (SIZE, len(players_df), True, 1.0)
+    assert [rows_read for rows_read, *_ in reports] == sorted(rows_read for rows_read, *_ in reports)
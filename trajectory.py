@@ -0,0 +1,144 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dataset_cache import get_artifact_path, load_arrays, remove_stale_artifacts, save_arrays
+from enums import ExistentFieldPlayerColumn, Stats
+from normalization import NormalizationMode
+from player_index import normalize_name
+
+
+def season_sort_key(year: str):
+    # "21-22" → 21; malformed seasons go first
+    try:
+        return int(str(year).split("-")[0])
+    except ValueError:
+        return -1
+
+
+def player_identities(players_df: pd.DataFrame) -> np.ndarray:
+    # Same person across seasons and clubs: normalized full name plus date of birth when exported
+    full_names = players_df["Full name"] if "Full name" in players_df.columns else players_df["Player"]
+    names = [normalize_name(name) for name in full_names.tolist()]
+    if "Birthday" in players_df.columns:
+        birthdays = pd.to_datetime(pd.Series(players_df["Birthday"].to_numpy()), errors="coerce").dt.strftime("%Y-%m-%d")
+        births = birthdays.fillna("").tolist()
+    else:
+        births = [""] * len(names)
+    return np.array([f"{name}|{birth}" for name, birth in zip(names, births)], dtype=str)
+
+
+class SeasonTable:
+    # Identity keys and within-season percentile ranks of every Stats metric for one
+    # league-season, against the players a pipeline.PopulationFilter keeps (all without one).
+    # Built once per dataset version and filter and persisted next to the workbook cache.
+    def __init__(self, dataset, columns: list[str], population_filter=None):
+        self.dataset = dataset
+        self.columns = list(columns)
+        filter_key = population_filter.key if population_filter else None
+        path = get_artifact_path("trajectory", (dataset.key, tuple(self.columns), filter_key), dataset.scope)
+
+        arrays = load_arrays(path)
+        if arrays is not None and len(arrays["identities"]) == len(dataset):
+            self.identities = arrays["identities"]
+            self.percentiles = arrays["percentiles"]
+            return
+
+        self.identities = player_identities(dataset.players_df)
+        available = [col for col in self.columns if col in dataset.numeric_columns]
+        self.percentiles = np.full((len(dataset), len(self.columns)), np.nan, dtype=np.float32)
+        if available:
+            positions = [self.columns.index(col) for col in available]
+            self.percentiles[:, positions] = dataset.baseline(population_filter).normalize(
+                dataset.values(available), available, NormalizationMode.PERCENTILE
+            )
+        try:
+            save_arrays(path, identities=self.identities, percentiles=self.percentiles)
+            remove_stale_artifacts(path)
+        except OSError:
+            pass  # persistence is best effort
+
+
+class TrajectoryIndex:
+    # Cross-season identity join over every processed league-season. `update` only builds
+    # tables for seasons it has not seen, so adding a workbook to the registry processes that
+    # season alone.
+    def __init__(self, columns: list[str] = None, population_filter=None):
+        self.columns = list(columns) if columns is not None else Stats.all_values()
+        self.population_filter = population_filter
+        self._tables = {}
+        self._members = {}  # identity -> [(dataset key, row)]
+        self._lock = threading.Lock()
+
+    def update(self, datasets) -> list:
+        datasets = list(datasets)
+        keys = {dataset.key for dataset in datasets}
+        with self._lock:
+            new = [dataset for dataset in datasets if dataset.key not in self._tables]
+            removed = {key for key in self._tables if key not in keys}
+
+        tables = [SeasonTable(dataset, self.columns, self.population_filter) for dataset in new]
+
+        with self._lock:
+            for key in removed:
+                del self._tables[key]
+            if removed:
+                # Drop members of seasons that left the registry (or were replaced by a new version)
+                for identity in list(self._members):
+                    kept = [member for member in self._members[identity] if member[0] not in removed]
+                    if kept:
+                        self._members[identity] = kept
+                    else:
+                        del self._members[identity]
+            for table in tables:
+                self._tables[table.dataset.key] = table
+                for row, identity in enumerate(table.identities):
+                    self._members.setdefault(str(identity), []).append((table.dataset.key, row))
+        return [dataset.key for dataset in new]
+
+    def __len__(self):
+        return len(self._tables)
+
+    def identity(self, dataset, row: int) -> str:
+        return str(self._tables[dataset.key].identities[row])
+
+    def seasons(self, dataset, row: int) -> list:
+        # (SeasonTable, row) per league-season, oldest season first. Exports can list a player twice
+        # in one season (a mid-season transfer, a duplicated row); the appearance with the most
+        # minutes stands for that season, the first one on a tie.
+        with self._lock:
+            members = [(self._tables[key], member_row) for key, member_row in self._members.get(self.identity(dataset, row), [])]
+        minutes = ExistentFieldPlayerColumn.MINUTES_PLAYED.value
+        best = {}
+        for table, member_row in members:
+            season = (table.dataset.league, table.dataset.year)
+            played = np.nan_to_num(table.dataset.array(minutes)[member_row])
+            if season not in best or played > best[season][2]:
+                best[season] = (table, member_row, played)
+        return sorted(
+            [(table, member_row) for table, member_row, _ in best.values()],
+            key=lambda member: (season_sort_key(member[0].dataset.year), member[0].dataset.league),
+        )
+
+    def trajectory(self, dataset, row: int, columns: list[str] = None) -> pd.DataFrame:
+        # One line per season and stat: raw value and percentile within that league-season
+        columns = self.columns if columns is None else [col for col in columns if col in self.columns]
+        positions = [self.columns.index(col) for col in columns]
+        records = []
+        for table, member_row in self.seasons(dataset, row):
+            season = table.dataset
+            player = season.players_df.iloc[member_row]
+            values = season.values([col for col in columns if col in season.numeric_columns], [member_row])[0]
+            value_of = dict(zip([col for col in columns if col in season.numeric_columns], values))
+            for col, position in zip(columns, positions):
+                records.append({
+                    "League": season.league,
+                    "Year": season.year,
+                    "Team": player.get("Team"),
+                    "Minutes played": player.get(ExistentFieldPlayerColumn.MINUTES_PLAYED.value),
+                    "Stat": col,
+                    "Value": float(value_of.get(col, np.nan)),
+                    "Percentile": float(table.percentiles[member_row, position]) * 100,
+                })
+        return pd.DataFrame(records, columns=["League", "Year", "Team", "Minutes played", "Stat", "Value", "Percentile"])
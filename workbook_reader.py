@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import time
+import zipfile
+import zlib
+
+import openpyxl
+import pandas as pd
+
+from enums import ColumnMapping, ExistentFieldPlayerColumn, ExistentGoalkeeperColumn
+
+MINUTES_COLUMN = ExistentFieldPlayerColumn.MINUTES_PLAYED.value
+CHUNK_ROWS = 2048
+BOOLEAN_TEXT = {"True": True, "False": False}
+# A sheet that breaks off midway: truncated XML (ElementTree and lxml errors are SyntaxErrors) or a damaged zip member
+PARSE_ERRORS = (SyntaxError, zipfile.BadZipFile, zlib.error, EOFError)
+# Set on frames holding only the rows read before such an error
+READ_ERROR_ATTR = "read_error"
+
+# Descriptive columns kept next to the stat columns; logos, position shares and other export
+# extras are never loaded
+PLAYER_INFO_COLUMNS = ["Player", "Full name", "Wyscout id", "Team", "Team within selected timeframe", "Competition",
+                       "Position", "Primary position", "Secondary position", "Third position", "Age", "Birthday",
+                       "Market value", "Contract expires", "Birth country", "Passport country", "Foot", "Weight", "On loan"]
+
+logger = logging.getLogger(__name__)
+
+
+def player_columns() -> list[str]:
+    # Every column the app reads: descriptive columns, field player and keeper stats, derivation inputs
+    columns = PLAYER_INFO_COLUMNS + [col.value for col in ExistentFieldPlayerColumn] + ExistentGoalkeeperColumn.all_values()
+    for mapping in (ColumnMapping.RATIO_MAPPING, ColumnMapping.COLUMN_MAPPING,
+                    ColumnMapping.GOALKEEPER_RATIO_MAPPING, ColumnMapping.GOALKEEPER_COLUMN_MAPPING):
+        for inputs in mapping.values():
+            columns.extend(inputs)
+    return list(dict.fromkeys(columns))
+
+
+# Part of every processed dataset key, so frames stored with another projection are not reused
+PROJECTION_VERSION = hashlib.sha1(repr(player_columns()).encode("utf-8")).hexdigest()[:12]
+
+
+def is_projected(column: str, columns=None) -> bool:
+    # Duplicate headers come out as "Aerial duels per 90.1" (the keeper copy), like pandas names them
+    wanted = set(player_columns() if columns is None else columns)
+    base, _, suffix = column.rpartition(".")
+    return column in wanted or (suffix.isdigit() and base in wanted)
+
+
+def project(df: pd.DataFrame, columns=None) -> pd.DataFrame:
+    wanted = set(player_columns() if columns is None else columns)
+    return df[[col for col in df.columns if is_projected(col, wanted)]]
+
+
+def is_complete(df: pd.DataFrame) -> bool:
+    # Frames of a sheet that broke off midway are served but never cached
+    return not df.attrs.get(READ_ERROR_ATTR)
+
+
+def _header_names(row) -> list[str]:
+    # Stripped names with pandas-style ".1", ".2" suffixes on repeated headers
+    names = []
+    seen = {}
+    for position, value in enumerate(row):
+        name = str(value).strip() if value is not None else f"Unnamed: {position}"
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        names.append(name if count == 0 else f"{name}.{count}")
+    return names
+
+
+class ReadProgress:
+    def __init__(self, path: str):
+        self.path = path
+        self.total_rows = None  # from the sheet dimensions, when the export records them
+        self.rows_read = 0
+        self.rows_kept = 0
+        self.complete = False
+        self.error = None
+        self.started = time.perf_counter()
+
+    @property
+    def fraction(self):
+        if self.complete:
+            return 1.0
+        return min(self.rows_read / self.total_rows, 1.0) if self.total_rows else None
+
+    def __repr__(self):
+        total = f"/{self.total_rows}" if self.total_rows else ""
+        return f"ReadProgress({self.path!r}, rows={self.rows_read}{total}, kept={self.rows_kept}, complete={self.complete})"
+
+
+class StreamingWorkbookReader:
+    # Reads the first sheet of an export row by row in openpyxl's read-only mode. Only projected
+    # columns are kept and rows under the minutes threshold are dropped as they stream in, so
+    # memory follows the filtered output rather than the sheet. Kept rows are turned into typed
+    # column chunks every `chunk_rows` rows. A sheet that breaks off midway (truncated or corrupt
+    # XML) yields the rows read until then, with `progress.error` and the READ_ERROR_ATTR attr set.
+    def __init__(self, path: str, columns=None, min_minutes: float = None, chunk_rows: int = CHUNK_ROWS, on_progress=None):
+        self.path = path
+        self.columns = set(player_columns() if columns is None else columns)
+        self.min_minutes = min_minutes
+        self.chunk_rows = chunk_rows
+        self.on_progress = on_progress
+        self.progress = ReadProgress(path)
+
+    def read(self) -> pd.DataFrame:
+        workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            if sheet.max_row:
+                self.progress.total_rows = max(sheet.max_row - 1, 0)
+            return self._read_rows(sheet.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+
+    def _read_rows(self, rows) -> pd.DataFrame:
+        try:
+            header = _header_names(next(rows))
+        except StopIteration:
+            self.progress.complete = True
+            return pd.DataFrame()
+
+        kept = [(position, name) for position, name in enumerate(header) if is_projected(name, self.columns)]
+        names = [name for _, name in kept]
+        minutes_position = header.index(MINUTES_COLUMN) if MINUTES_COLUMN in header else None
+        if self.min_minutes is not None and minutes_position is None:
+            logger.warning("'%s' column not found in dataset: %s", MINUTES_COLUMN, self.path)
+
+        chunks = []
+        buffer = []
+        try:
+            for row in rows:
+                self.progress.rows_read += 1
+                if self._keep(row, minutes_position):
+                    buffer.append([row[position] if position < len(row) else None for position, _ in kept])
+                    self.progress.rows_kept += 1
+                if len(buffer) >= self.chunk_rows:
+                    chunks.append(_typed_chunk(buffer, names))
+                    buffer = []
+                if self.progress.rows_read % self.chunk_rows == 0:
+                    self._report()
+            self.progress.complete = True
+        except PARSE_ERRORS as exc:
+            self.progress.error = str(exc)
+            logger.warning("Stopped reading %s after %d rows: %s", self.path, self.progress.rows_read, exc)
+
+        if buffer:
+            chunks.append(_typed_chunk(buffer, names))
+        self._report()
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=names)
+        if self.progress.error:
+            df.attrs[READ_ERROR_ATTR] = self.progress.error
+        return df
+
+    def _keep(self, row, minutes_position) -> bool:
+        if all(value is None for value in row):
+            return False  # trailing blank rows of the export
+        if self.min_minutes is None or minutes_position is None:
+            return True
+        minutes = row[minutes_position] if minutes_position < len(row) else None
+        return isinstance(minutes, (int, float)) and minutes > self.min_minutes
+
+    def _report(self):
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
+
+
+def _typed_chunk(buffer: list, names: list[str]) -> pd.DataFrame:
+    # Column-wise inference like read_excel: int64, float64, bool, datetime or text
+    chunk = {}
+    for name, values in zip(names, zip(*buffer)):
+        series = pd.Series(values)
+        if series.isna().all():
+            series = series.astype(float)  # empty cells only: NaN floats, as read_excel returns them
+        elif not pd.api.types.is_numeric_dtype(series) and series.isin(BOOLEAN_TEXT).all():
+            series = series.map(BOOLEAN_TEXT).astype(bool)  # "True"/"False" text cells, e.g. "On loan"
+        chunk[name] = series
+    return pd.DataFrame(chunk)
+
+
+def stream_player_data(path: str, min_minutes: float = None, columns=None, on_progress=None) -> pd.DataFrame:
+    return StreamingWorkbookReader(path, columns, min_minutes, on_progress=on_progress).read()